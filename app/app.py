@@ -3,17 +3,36 @@ from modules.daily_practice import display_daily_practice
 from modules.skill_training import display_skill_training
 from modules.presentation import display_presentation
 from modules.progress import display_progress
-from modules.home import display_home
+from modules.home import home_page
+from utils.utils import current_user_id, has_progress, service_stats, DEFAULT_USER
+from utils.config import SHOW_DIAGNOSTICS
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Home", "Daily Practice","Skill Training", "Presentation", "Progress" ])
+# Only the selected page runs on each rerun, so one page's widgets never trigger another page's work
+pages = st.navigation([
+    home_page(),
+    st.Page(display_daily_practice, title="Daily Practice", url_path="daily_practice"),
+    st.Page(display_skill_training, title="Skill Training", url_path="skill_training"),
+    st.Page(display_presentation, title="Presentation", url_path="presentation"),
+    st.Page(display_progress, title="Progress", url_path="progress"),
+])
 
-with tab1:
-    display_home()
-with tab2:
-    display_daily_practice()
-with tab3:
-    display_skill_training()
-with tab4:
-    display_presentation()
-with tab5:
-    display_progress()
+
+# Runs before the script (button callback), so it may still set the sidebar widget's key
+def use_legacy_history():
+    st.session_state.user_id = DEFAULT_USER
+
+
+# Progress is stored per learner; the ID is kept in the URL (?user=...) so bookmarks keep the same history
+user_id = current_user_id()
+st.sidebar.text_input("Learner ID", key="user_id", help="Your progress is saved under this ID. Use the same ID to continue where you left off.")
+st.sidebar.caption("The learner ID is not a password: anyone who knows it can see and add to its progress.")
+# Rows imported from the old progress.csv belong to "default"; point a learner without history of their own to them
+if user_id != DEFAULT_USER and not has_progress(user_id) and has_progress(DEFAULT_USER):
+    st.sidebar.info(f"Progress saved before learner IDs were added is kept under the ID \"{DEFAULT_USER}\".")
+    st.sidebar.button("Open earlier progress", on_click=use_legacy_history)
+
+if SHOW_DIAGNOSTICS:
+    with st.sidebar.expander("Service status"):
+        st.json(service_stats())
+
+pages.run()
@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Headless batch grading: evaluates (module, task, response) records with a fixed number of workers,
+# stores scores, metrics and feedback in the progress store, and skips records already stored, so
+# an interrupted run can simply be started again. Run from the app folder:
+#
+#     python evaluate_batch.py cohort.jsonl --workers 8 --rpm 200
+#     python evaluate_batch.py transcripts/ --module Presentation --task "Pitch a product in 2 minutes"
+#
+# JSONL records have "module", "task" and "response" (or "chat": [{"role", "content"}, ...] for
+# Daily Practice), and optionally "id", "user" and "date". In a directory, every .txt file is one
+# response (user = file name) and every .json/.jsonl file holds records.
+
+skill_modules = ["Impromptu Speaking", "Storytelling", "Conflict Resolution"]
+modules = ["Presentation", "Daily Practice"] + skill_modules
+
+
+# Function to read records from a JSONL file or a directory of .txt/.json/.jsonl files
+def load_records(path, module=None, task=None, user=None):
+    if os.path.isdir(path):
+        records = []
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            stem, ext = os.path.splitext(name)
+            if ext == ".txt":
+                with open(file_path, encoding="utf-8") as f:
+                    records.append({"user": stem, "response": f.read(), "source": file_path})
+            elif ext in (".json", ".jsonl"):
+                records.extend(load_records(file_path))
+    else:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                data = json.load(f)
+                records = data if isinstance(data, list) else [data]
+            else:
+                records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        record.setdefault("module", module)
+        record.setdefault("task", task)
+        if user is not None:
+            record["user"] = user
+    return records
+
+
+# Function to give each record a stable key: its "id", or a hash of what is being evaluated
+def record_key(record):
+    if record.get("id"):
+        return str(record["id"])
+    content = json.dumps([record.get("user"), record["module"], record.get("task"),
+                          record.get("response"), record.get("chat")], sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def validate_record(record):
+    if record.get("module") not in modules:
+        return f"unknown module {record.get('module')!r} (expected one of {', '.join(modules)})"
+    if record["module"] == "Daily Practice":
+        return None if record.get("chat") else "Daily Practice records need a \"chat\" list"
+    if not (record.get("response") or "").strip():
+        return "empty response"
+    if not record.get("task"):
+        return "missing task"
+    return None
+
+
+# Function to evaluate one record; returns (feedback, scores, metrics), scores None on failure
+def evaluate_record(record):
+    from utils.utils import evaluate_daily_practice, evaluate_presentation, evaluate_skilltraining
+    from utils.llm_client import BACKGROUND
+
+    # Batch work is deferrable: BACKGROUND leaves the interactive reserve free for the live app
+    if record["module"] == "Presentation":
+        return evaluate_presentation(record["response"], record["task"], priority=BACKGROUND)
+    if record["module"] == "Daily Practice":
+        return evaluate_daily_practice(record["chat"], priority=BACKGROUND)
+    return evaluate_skilltraining(record["response"], record["module"], record["task"], priority=BACKGROUND)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a cohort of responses without the Streamlit app.")
+    parser.add_argument("input", help="JSONL file, or a directory of .txt/.json/.jsonl files")
+    parser.add_argument("--module", choices=modules, help="module for records that don't name one")
+    parser.add_argument("--task", help="task/prompt for records that don't include one")
+    parser.add_argument("--user", help="learner ID for every record (default: the record's, or the file name)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent evaluations (default 4)")
+    parser.add_argument("--rpm", type=int, help="requests per minute budget (default LLM_REQUESTS_PER_MINUTE)")
+    parser.add_argument("--tpm", type=int, help="tokens per minute budget (default LLM_TOKENS_PER_MINUTE)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be evaluated")
+    args = parser.parse_args()
+
+    from utils.utils import progress_store, progress_row, DEFAULT_USER
+    from utils import llm_client
+    from utils.llm_client import scheduler, resilience_stats
+
+    # utils turns on debug logging for the app; per-call logs would drown the progress output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Records queue for the quota instead of failing when the next slot is more than a timeout away;
+    # only API errors fail a record
+    llm_client.wait_for_admission = True
+    if args.rpm:
+        scheduler.requests_per_minute = args.rpm
+    if args.tpm:
+        scheduler.tokens_per_minute = args.tpm
+
+    records = load_records(args.input, args.module, args.task, args.user)
+    valid, invalid = [], []
+    for record in records:
+        error = validate_record(record)
+        if error:
+            invalid.append((record, error))
+        else:
+            valid.append(record)
+    keyed = {record_key(record): record for record in valid}
+    done = progress_store.completed_batch_keys(keyed)
+    pending = {key: record for key, record in keyed.items() if key not in done}
+    for record, error in invalid:
+        print(f"skipped {record.get('id') or record.get('source') or record.get('user')}: {error}", file=sys.stderr)
+    print(f"{len(records)} records: {len(done)} already evaluated, {len(pending)} to evaluate, {len(invalid)} invalid",
+          file=sys.stderr)
+    if args.dry_run or not pending:
+        return
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    succeeded, failed = 0, []
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch")
+    futures = {executor.submit(evaluate_record, record): key for key, record in pending.items()}
+
+    def save(future):
+        nonlocal succeeded
+        key = futures[future]
+        record = pending[key]
+        try:
+            feedback, scores, metrics = future.result()
+        except Exception as e:
+            feedback, scores, metrics = str(e), None, None
+        if scores is None:
+            failed.append({"key": key, "error": feedback})
+            print(f"failed {key}: {feedback[:200]}", file=sys.stderr)
+            return
+        row = progress_row(record.get("date") or today, record["module"], scores,
+                           record.get("user") or DEFAULT_USER, metrics)
+        # False when an interrupt hit after this item was stored and it is being saved again by the drain
+        if not progress_store.record_batch_item(key, row, feedback):
+            return
+        succeeded += 1
+        if succeeded % 10 == 0:
+            print(f"{succeeded}/{len(pending)} evaluated", file=sys.stderr)
+
+    saved = set()
+    try:
+        for future in as_completed(futures):
+            save(future)
+            saved.add(future)
+    except KeyboardInterrupt:
+        # Records not started yet are dropped. The ones already running may have been sent (and billed), so
+        # wait for them and save them rather than paying for them again on the next run
+        executor.shutdown(wait=False, cancel_futures=True)
+        running = [future for future in futures if future not in saved and not future.cancelled()]
+        print(f"Interrupted; saving {len(running)} evaluations already started. Press Ctrl+C again to quit "
+              f"without them; any that were already sent are billed again on the next run.", file=sys.stderr)
+        try:
+            for future in as_completed(running):
+                save(future)
+        except KeyboardInterrupt:
+            print(f"{succeeded} evaluated in this run; quitting without the rest.", file=sys.stderr)
+            # sys.exit would still wait for the worker threads at interpreter shutdown
+            os._exit(130)
+        print(f"{succeeded} evaluated in this run. Run the same command again to continue.", file=sys.stderr)
+        sys.exit(130)
+    executor.shutdown()
+
+    print(json.dumps({
+        "evaluated": succeeded,
+        "failed": failed,
+        "skipped_already_done": len(done),
+        "invalid": len(invalid),
+        "seconds": round(time.monotonic() - started, 1),
+        "scheduler": scheduler.stats(),
+        "resilience": resilience_stats(),
+    }, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
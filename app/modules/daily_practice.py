@@ -1,5 +1,70 @@
 import streamlit as st
-from utils.utils import record_and_convert,daily_practice_chat_response, generate_feedback_daily_practice
+from modules.home import home_page
+from utils.utils import record_and_convert,daily_practice_chat_response, daily_practice_chat_stream, collect_speech, generate_feedback_daily_practice, new_memory, store_audio, load_audio
+
+
+# Number of latest messages whose audio is loaded on every rerun; older audio is read from disk only when played
+EAGER_AUDIO_MESSAGES = 2
+
+
+# Function to render a message's stored audio, loading it from the blob store only when needed
+def show_message_audio(message, index, eager):
+    handle = message.get("audio")
+    if not handle:
+        return
+    if eager or st.session_state.get("playing_audio") == handle:
+        data = load_audio(handle)
+        if data is None:
+            st.caption("Audio is no longer available.")
+        else:
+            st.audio(data, format=message["audio_format"])
+    elif st.button("▶ Play", key=f"play_audio_{index}"):
+        st.session_state.playing_audio = handle
+        st.rerun()
+
+
+# Function to render one chat message and its audio
+def show_message(message, index, eager):
+    if message["role"] == "user":
+        if message["type"] == "text":
+            st.markdown(f'<div class="user-message"><b>You:</b> {message["content"]}</div>', unsafe_allow_html=True)
+        elif message["type"] == "audio":
+            st.markdown(f'<div class="user-message"><b>You (Voice):</b></div>', unsafe_allow_html=True)
+            show_message_audio(message, index, eager)
+    else:
+        st.markdown(f'<div class="ai-message"><b>AI:</b> {message["content"]}</div>', unsafe_allow_html=True)
+        show_message_audio(message, index, eager)
+
+
+# Function to get the AI reply for the current history and append it, streaming tokens when enabled.
+# `area` is the end of the conversation, so the message just sent and the reply show up in the chat
+# rather than below the input row.
+def respond_to_user(role, stream_replies, area):
+    with area:
+        show_message(st.session_state.chat_history[-1], len(st.session_state.chat_history) - 1, True)
+        if stream_replies:
+            reply = {}
+            st.markdown('<b>AI:</b>', unsafe_allow_html=True)
+            ai_response = st.write_stream(daily_practice_chat_stream(role, st.session_state.chat_history, reply, st.session_state.chat_memory))
+            if reply["error"]:
+                st.error(reply["error"])
+            else:
+                message = {"role": "assistant", "content": ai_response.strip(), "type": "text"}
+                ai_audio = collect_speech(reply)
+                if ai_audio is not None:
+                    message["audio"] = store_audio(ai_audio, "mp3")
+                    message["audio_format"] = "audio/mp3"
+                st.session_state.chat_history.append(message)
+        else:
+            with st.spinner("Getting AI response..."):
+                ai_response, ai_audio = daily_practice_chat_response(role, st.session_state.chat_history, st.session_state.chat_memory)
+            if ai_audio is None:  # Error case
+                st.error(ai_response)  # Display error message
+            else:
+                st.session_state.chat_history.append({"role": "assistant", "content": ai_response, "type": "text",
+                                                      "audio": store_audio(ai_audio, "mp3"), "audio_format": "audio/mp3"})
+    st.rerun()
+
 def display_daily_practice():
     #page title
     st.title("Daily Practice")
@@ -88,27 +153,25 @@ def display_daily_practice():
     
     # Conversation Role Selection
     role = st.selectbox("Choose your conversation partner:", ["Job Interviewer", "Debate Opponent", "Casual Friend", "custom"])
+    stream_replies = st.toggle("Stream replies", value=True)
 
     # Initialize chat history in session state
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    # Running summary of turns that no longer fit in the request budget
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = new_memory()
 
     # Conversation display container
     st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     st.subheader("Conversation History:")
     
     # Display chat history
-    for message in st.session_state.chat_history:
-        if message["role"] == "user":
-            if message["type"] == "text":
-                st.markdown(f'<div class="user-message"><b>You:</b> {message["content"]}</div>', unsafe_allow_html=True)
-            elif message["type"] == "audio":
-                st.markdown(f'<div class="user-message"><b>You (Voice):</b></div>', unsafe_allow_html=True)
-                st.audio(message["audio_file"], format="audio/wav")
-        else:
-            st.markdown(f'<div class="ai-message"><b>AI:</b> {message["content"]}</div>', unsafe_allow_html=True)
-            if "audio_file" in message:
-                st.audio(message["audio_file"], format="audio/mp3")
+    history_length = len(st.session_state.chat_history)
+    for index, message in enumerate(st.session_state.chat_history):
+        show_message(message, index, index >= history_length - EAGER_AUDIO_MESSAGES)
+    # The turn being answered is drawn here, before the input row
+    pending_turn = st.container()
     
     # Input columns
     col1, col2, col3 = st.columns([4, 1, 1])
@@ -129,25 +192,14 @@ def display_daily_practice():
     # Process input (text or voice)
     if send_button and user_input:
         st.session_state.chat_history.append({"role": "user", "content": user_input, "type": "text"})
-        with st.spinner("Getting AI response..."):
-            ai_response, ai_audio = daily_practice_chat_response(role, st.session_state.chat_history)
-        if ai_audio is None:  # Error case
-            st.error(ai_response)  # Display error message
-        else:
-            st.session_state.chat_history.append({"role": "assistant", "content": ai_response, "type": "text", "audio_file": ai_audio})
-        st.rerun()
+        respond_to_user(role, stream_replies, pending_turn)
 
     elif record_button:
-        audio_file, voice_text = record_and_convert()
+        audio_file, voice_text, _ = record_and_convert()
         if voice_text and not voice_text.startswith("Sorry") and not voice_text.startswith("Could not"):
-            st.session_state.chat_history.append({"role": "user", "content": voice_text, "type": "audio", "audio_file": audio_file})
-            with st.spinner("Getting AI response..."):
-                ai_response, ai_audio = daily_practice_chat_response(role, st.session_state.chat_history)
-            if ai_audio is None:  # Error case
-                st.error(ai_response)  # Display error message
-            else:
-                st.session_state.chat_history.append({"role": "assistant", "content": ai_response, "type": "text", "audio_file": ai_audio})
-            st.rerun()
+            st.session_state.chat_history.append({"role": "user", "content": voice_text, "type": "audio",
+                                                  "audio": store_audio(audio_file, "flac"), "audio_format": "audio/flac"})
+            respond_to_user(role, stream_replies, pending_turn)
 
     # Rest of the existing code for feedback section remains the same
     st.markdown('<div class="feedback-section">', unsafe_allow_html=True)
@@ -161,28 +213,10 @@ def display_daily_practice():
         st.markdown('<div class="start-new-button">', unsafe_allow_html=True)
         if st.button("Start New Chat"):
             st.session_state.chat_history = []
+            st.session_state.chat_memory = new_memory()
         st.markdown('</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Back to Home Button
-    st.markdown(
-        """
-        <div style="display: flex; justify-content: flex-end; margin-top: 20px;">
-            <a href="/" target="_self">
-                <button style="
-                    padding: 10px 20px;
-                    font-size: 16px;
-                    cursor: pointer;
-                    background-color: #34495e;
-                    color: white;
-                    border: none;
-                    border-radius: 20px;
-                    transition: background-color 0.3s ease;
-                " onmouseover="this.style.backgroundColor='#2c3e50'" onmouseout="this.style.backgroundColor='#34495e'">
-                    ⬅ Back to Home
-                </button>
-            </a>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
\ No newline at end of file
+    # Back to Home Button; st.page_link switches pages within the session, so the learner ID in session_state
+    # is kept and app.py puts it back in the URL
+    st.page_link(home_page(), label="Back to Home", icon="⬅️")
\ No newline at end of file
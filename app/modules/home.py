@@ -1,5 +1,11 @@
 import streamlit as st
 
+
+# Function to build the home page entry; app.py registers it with st.navigation and the other pages link back to it
+def home_page():
+    return st.Page(display_home, title="Home", url_path="home", default=True)
+
+
 def display_home():
     # CSS for enhanced home page styling with tabs
     st.markdown("""
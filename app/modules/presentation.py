@@ -1,4 +1,5 @@
 import streamlit as st
+from modules.home import home_page
 from utils.utils import record_and_convert, generate_feedback_presentation
 
 def display_presentation():    
@@ -88,38 +89,25 @@ def display_presentation():
              
     # Process voice input
     if record_button:
-        audio_file, text = record_and_convert()
+        # The transcript fills in while the user is still speaking
+        live_transcript = st.empty()
+        audio_file, text, speech_metrics = record_and_convert(on_partial=lambda partial: live_transcript.caption(partial))
+        live_transcript.empty()
         if not text.startswith("Sorry") and not text.startswith("Could not"):
             with st.chat_message("user"):
                 st.write("Voice Presentation:")
-                st.audio(audio_file, format="audio/wav")
+                st.audio(audio_file, format="audio/flac")
+                if speech_metrics and "words_per_minute" in speech_metrics:
+                    st.caption(f"{speech_metrics['words_per_minute']:.0f} words/min · {speech_metrics['pauses']} pauses "
+                               f"· {speech_metrics['fillers']} fillers")
             with st.spinner("Evaluating your presentation..."):
-                feedback = generate_feedback_presentation(text,task, is_voice=True)
+                feedback = generate_feedback_presentation(text,task, is_voice=True, speech_metrics=speech_metrics)
             with st.chat_message("assistant"):
                 st.write("### Feedback Report")
                 st.markdown(feedback)
 
-    # Back to Home Button
-    st.markdown(
-        """
-        <div style="display: flex; justify-content: flex-end; margin-top: 20px;">
-            <a href="/" target="_self">
-                <button style="
-                    padding: 10px 20px;
-                    font-size: 16px;
-                    cursor: pointer;
-                    background-color: #34495e;
-                    color: white;
-                    border: none;
-                    border-radius: 20px;
-                    transition: background-color 0.3s ease;
-                " onmouseover="this.style.backgroundColor='#2c3e50'" onmouseout="this.style.backgroundColor='#34495e'">
-                    ⬅ Back to Home
-                </button>
-            </a>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    # Back to Home Button; st.page_link switches pages within the session, so the learner ID in session_state
+    # is kept and app.py puts it back in the URL
+    st.page_link(home_page(), label="Back to Home", icon="⬅️")
 
     st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
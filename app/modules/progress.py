@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-from utils.utils import generate_tips_from_trend
+from modules.home import home_page
+from utils.utils import generate_tips_from_trend, load_daily_scores, load_module_daily_scores, load_recent_scores, load_recent_metrics, current_user_id
 
 def display_progress():
     st.title("📈 Progress Tracking")
@@ -62,35 +62,33 @@ def display_progress():
         </style>
     """, unsafe_allow_html=True)
 
-    # Interactive Progress Chart from CSV
+    # Interactive Progress Chart from the progress store
     st.subheader("Progress Over Time")
-    try:
-        df = pd.read_csv("progress.csv")
-        if df.empty:
-            st.write("No data for graph yet. Keep practicing!")
-        else:
-            df['date'] = pd.to_datetime(df['date'])
-            # Calculate single average score per day across all criteria
-            criteria_cols = ['Content', 'Delivery', 'Structure', 'Language skills', 'Creativity', 'Communication', 'Vocabulary', 'Grammar']
-            avg_scores = df.groupby('date')[criteria_cols].mean().mean(axis=1).to_frame(name='Average Score')
-
-            # Single-user interactive chart
-            with st.container(border=True):
-                rolling_average = st.toggle("Rolling Average (7-day)", value=False)
-                if rolling_average:
-                    chart_data = avg_scores.rolling(7, min_periods=1).mean()  # Rolling average over 7 days
-                else:
-                    chart_data = avg_scores
+    user_id = current_user_id()
+    daily_scores = load_daily_scores(user_id)
+    if daily_scores.empty:
+        st.write("No data for graph yet. Start practicing!")
+    else:
+        # Calculate single average score per day across all criteria
+        avg_scores = daily_scores.mean(axis=1).to_frame(name='Average Score')
 
-                # Tabs for chart and dataframe
-                tab1, tab2 = st.tabs(["Chart", "Data"])
-                with tab1:
-                    st.line_chart(chart_data, height=250, use_container_width=True)
-                with tab2:
-                    st.dataframe(df, height=250, use_container_width=True)  # Full raw data
+        # Single-user interactive chart
+        with st.container(border=True):
+            rolling_average = st.toggle("Rolling Average (7-day)", value=False)
+            if rolling_average:
+                chart_data = avg_scores.rolling(7, min_periods=1).mean()  # Rolling average over 7 days
+            else:
+                chart_data = avg_scores
 
-    except FileNotFoundError:
-        st.write("No data for graph yet. Start practicing!")
+            # Tabs for chart and dataframe
+            tab1, tab2, tab3 = st.tabs(["Chart", "Data", "Measured"])
+            with tab1:
+                st.line_chart(chart_data, height=250, use_container_width=True)
+            with tab2:
+                st.dataframe(load_module_daily_scores(user_id), height=250, use_container_width=True, hide_index=True)  # Daily averages per module
+            with tab3:
+                # Computed locally from each response, so they are comparable from one session to the next
+                st.dataframe(load_recent_metrics(user_id), height=250, use_container_width=True, hide_index=True)
 
     # Get Tips Section
     st.subheader("Advice")
@@ -99,32 +97,18 @@ def display_progress():
     st.markdown('<div class="tips-button">', unsafe_allow_html=True)
     if st.button("Generate"):
         with st.spinner("Generating tips based on your progress..."):
-            try:
-                df = pd.read_csv("progress.csv")
-                tips = generate_tips_from_trend(df)
-                if tips.startswith("Oops!") or "error" in tips.lower():
-                    st.error(tips)  # Display API errors in red
-                else:
-                    st.markdown("### Your Personalized Tips")
-                    st.markdown(tips)
-            except FileNotFoundError:
-                st.write("No progress data available yet. Start practicing to get tips!")
+            tips = generate_tips_from_trend(daily_scores, load_recent_scores(user_id))
+            if tips.startswith("Oops!") or "error" in tips.lower():
+                st.error(tips)  # Display API errors in red
+            else:
+                st.markdown("### Your Personalized Tips")
+                st.markdown(tips)
     st.markdown('</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Back to Home Button
-    st.markdown(
-        """
-        <div class="back-to-home-container">
-            <a href="/" target="_self">
-                <button class="back-to-home-button">
-                    ⬅ Back to Home
-                </button>
-            </a>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    # Back to Home Button; st.page_link switches pages within the session, so the learner ID in session_state
+    # is kept and app.py puts it back in the URL
+    st.page_link(home_page(), label="Back to Home", icon="⬅️")
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.utils import record_and_convert, generate_feedback_skilltraining, generate_prompt_skilltraining
+from modules.home import home_page
+from utils.utils import record_and_convert, generate_feedback_skilltraining, next_prompt_skilltraining
 
 def display_skill_training():
     # Page setup
@@ -47,14 +48,19 @@ def display_skill_training():
     # Initialize session state
     if "current_prompt" not in st.session_state or st.session_state.get("current_activity") != activity:
         with st.spinner("Generating a new prompt..."):
-            st.session_state.current_prompt = generate_prompt_skilltraining(activity)
+            st.session_state.current_prompt, st.session_state.prompt_error = next_prompt_skilltraining(activity)
         st.session_state.current_activity = activity
         st.session_state.feedback = None
 
     # Display the prompt as an AI chat message
+    # No prompt when it couldn't be generated; the error is shown instead and there is nothing to answer yet
+    no_prompt = st.session_state.current_prompt is None
     with st.chat_message("assistant"):
-        if st.session_state.current_prompt.startswith("Oops!") or "error" in st.session_state.current_prompt.lower():
-            st.error(st.session_state.current_prompt)  # Display errors in red
+        if no_prompt:
+            st.error(st.session_state.prompt_error)  # Display errors in red
+            if st.button("Try again"):
+                del st.session_state["current_prompt"]
+                st.rerun()
         else:
             if activity == "Impromptu Speaking":
                 st.write(f"Topic: {st.session_state.current_prompt}")
@@ -65,11 +71,11 @@ def display_skill_training():
 
     # Record button
     st.markdown('<div class="record-button">', unsafe_allow_html=True)
-    record_button = st.button("Record Response")
+    record_button = st.button("Record Response", disabled=no_prompt)
     st.markdown('</div>', unsafe_allow_html=True)
 
     # Chat input for text response
-    user_input = st.chat_input("Type your response here...")
+    user_input = st.chat_input("Type your response here...", disabled=no_prompt)
 
     # Process text input
     if user_input:
@@ -82,38 +88,22 @@ def display_skill_training():
             st.markdown(feedback)
     # Process voice input
     if record_button:
-        audio_file, text = record_and_convert()
+        # The transcript fills in while the user is still speaking
+        live_transcript = st.empty()
+        audio_file, text, _ = record_and_convert(on_partial=lambda partial: live_transcript.caption(partial))
+        live_transcript.empty()
         if not text.startswith("Sorry") and not text.startswith("Could not"):
             with st.chat_message("user"):
                 st.write("Voice Response:")
-                st.audio(audio_file, format="audio/wav")
+                st.audio(audio_file, format="audio/flac")
             with st.spinner(f"Evaluating your {activity.lower()} response..."):
                 feedback = generate_feedback_skilltraining(text, activity, is_voice=True)
             with st.chat_message("assistant"):
                 st.write("### Feedback Report")
                 st.markdown(feedback)
 
-    # Back to Home Button
-    st.markdown(
-        """
-        <div style="display: flex; justify-content: flex-end; margin-top: 20px;">
-            <a href="/" target="_self">
-                <button style="
-                    padding: 10px 20px;
-                    font-size: 16px;
-                    cursor: pointer;
-                    background-color: #34495e;
-                    color: white;
-                    border: none;
-                    border-radius: 20px;
-                    transition: background-color 0.3s ease;
-                " onmouseover="this.style.backgroundColor='#2c3e50'" onmouseout="this.style.backgroundColor='#34495e'">
-                    ⬅ Back to Home
-                </button>
-            </a>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    # Back to Home Button; st.page_link switches pages within the session, so the learner ID in session_state
+    # is kept and app.py puts it back in the URL
+    st.page_link(home_page(), label="Back to Home", icon="⬅️")
 
     st.markdown('</div>', unsafe_allow_html=True)
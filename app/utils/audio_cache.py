@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+# Content-addressed cache for synthesized audio: an in-memory LRU tier in front of an on-disk store.
+# Both tiers are bounded by total bytes. One instance is shared by every session in the process.
+class AudioCache:
+    def __init__(self, directory, max_memory_bytes, max_disk_bytes):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = None
+        self.in_flight = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".mp3")
+
+    # Returns the cached bytes for key, or calls create() once (even with concurrent callers) and stores the result
+    def get_or_create(self, key, create):
+        while True:
+            with self.lock:
+                data = self._get_memory(key)
+                if data is not None:
+                    self.memory_hits += 1
+                    return data
+                event = self.in_flight.get(key)
+                if event is None:
+                    event = self.in_flight[key] = threading.Event()
+                    break
+            # Another session is already producing this entry; wait for it instead of synthesizing twice
+            event.wait()
+
+        try:
+            data = self._read_disk(key)
+            if data is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                    self._put_memory(key, data)
+                return data
+
+            with self.lock:
+                self.misses += 1
+            data = create()
+            with self.lock:
+                self._put_memory(key, data)
+            self._write_disk(key, data)
+            return data
+        finally:
+            with self.lock:
+                self.in_flight.pop(key).set()
+
+    def _get_memory(self, key):
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+        return data
+
+    def _put_memory(self, key, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # mtime doubles as the recency stamp for disk eviction
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.error(f"Error reading audio cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Error writing audio cache entry {key}: {e}")
+            return
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, _, size in self._disk_entries())
+            else:
+                self.disk_bytes += len(data)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    # Drops least recently used files until the store is back under budget
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.disk_bytes = total
+
+    def stats(self):
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes,
+            }
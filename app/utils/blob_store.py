@@ -0,0 +1,105 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+
+# Formats that are already compressed are stored as-is; everything else is deflated
+COMPRESSED_FORMATS = {"mp3", "ogg", "opus", "flac"}
+
+
+# Disk-backed store for per-session audio. Session state only keeps the returned handle;
+# bytes are read back when a message is played. Each session is bounded by a byte quota
+# (oldest blobs are dropped first) and sessions idle longer than the TTL are removed.
+class BlobStore:
+    def __init__(self, directory, session_quota_bytes, ttl_seconds, sweep_interval=300):
+        self.directory = directory
+        self.session_quota_bytes = session_quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.lock = threading.Lock()
+        self.last_sweep = 0.0
+
+    def _session_dir(self, session_id):
+        return os.path.join(self.directory, session_id)
+
+    # Stores data for a session and returns a handle ("<session>/<blob>.<fmt>[.z]")
+    def put(self, session_id, data, fmt):
+        suffix = "" if fmt in COMPRESSED_FORMATS else ".z"
+        payload = data if not suffix else zlib.compress(data, 6)
+        name = f"{uuid.uuid4().hex}.{fmt}{suffix}"
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        path = os.path.join(session_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(payload)
+        os.replace(path + ".tmp", path)
+        self._enforce_quota(session_dir)
+        self._maybe_sweep()
+        return f"{session_id}/{name}"
+
+    # Returns the original bytes for a handle, or None if it expired or was evicted
+    def get(self, handle):
+        session_id, _, name = handle.partition("/")
+        if not session_id or not name or os.sep in name or name.startswith("."):
+            return None
+        path = os.path.join(self._session_dir(session_id), name)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        return zlib.decompress(payload) if name.endswith(".z") else payload
+
+    def delete_session(self, session_id):
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def _enforce_quota(self, session_dir):
+        entries = []
+        for name in os.listdir(session_dir):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(session_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        total = sum(size for _, _, size in entries)
+        # Oldest first; the newest blob (the one just written) is always kept
+        for _, name, size in entries[:-1]:
+            if total <= self.session_quota_bytes:
+                break
+            try:
+                os.remove(os.path.join(session_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self.lock:
+            if now - self.last_sweep < self.sweep_interval:
+                return
+            self.last_sweep = now
+        self.cleanup(now)
+
+    # Removes sessions whose newest blob is older than the TTL
+    def cleanup(self, now=None):
+        now = now or time.time()
+        try:
+            session_ids = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for session_id in session_ids:
+            session_dir = self._session_dir(session_id)
+            try:
+                newest = max((os.path.getmtime(os.path.join(session_dir, name)) for name in os.listdir(session_dir)),
+                             default=os.path.getmtime(session_dir))
+            except OSError:
+                continue
+            if now - newest > self.ttl_seconds:
+                logging.debug(f"Removing expired audio for session {session_id}")
+                self.delete_session(session_id)
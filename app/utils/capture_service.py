@@ -0,0 +1,190 @@
+import logging
+import math
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from contextlib import contextmanager
+
+from utils.voice_capture import frame_rms
+
+
+# Live microphone input through SpeechRecognition's PyAudio wrapper
+class MicrophoneSource:
+    def __init__(self, sample_rate=None, chunk=1024):
+        self.requested_rate = sample_rate
+        self.chunk = chunk
+        self.mic = None
+
+    def open(self):
+        import speech_recognition as sr
+
+        self.mic = sr.Microphone(sample_rate=self.requested_rate, chunk_size=self.chunk)
+        self.mic.__enter__()
+        self.sample_rate = self.mic.SAMPLE_RATE
+        self.sample_width = self.mic.SAMPLE_WIDTH
+
+    def read(self):
+        return self.mic.stream.read(self.chunk)
+
+    def close(self):
+        if self.mic is not None:
+            self.mic.__exit__(None, None, None)
+            self.mic = None
+
+
+# A WAV file standing in for the microphone, for tests and headless runs. With realtime=True chunks
+# arrive at the recording's pace; with loop=True the file repeats instead of ending the stream.
+class WavSource:
+    def __init__(self, path, chunk=1024, realtime=False, loop=False):
+        self.path = path
+        self.chunk = chunk
+        self.realtime = realtime
+        self.loop = loop
+        self.wav = None
+
+    def open(self):
+        self.wav = wave.open(self.path, "rb")
+        if self.wav.getnchannels() != 1:
+            raise ValueError(f"{self.path} must be mono")
+        self.sample_rate = self.wav.getframerate()
+        self.sample_width = self.wav.getsampwidth()
+
+    def read(self):
+        data = self.wav.readframes(self.chunk)
+        if not data and self.loop:
+            self.wav.rewind()
+            data = self.wav.readframes(self.chunk)
+        if data and self.realtime:
+            time.sleep(len(data) / self.sample_width / self.sample_rate)
+        return data
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+
+
+# Keeps one input stream open for the life of the process. A background thread reads it continuously
+# into a short pre-roll ring buffer, so a recording starts with the audio from just before the click
+# and the first syllable isn't clipped. The ambient energy threshold is measured while nobody is
+# recording and refreshed every `recalibrate_every` seconds, instead of a one-second calibration per press.
+class CaptureService:
+    def __init__(self, source, preroll_seconds=0.5, calibration_seconds=1.0, recalibrate_every=60.0,
+                 energy_ratio=1.5, min_threshold=50):
+        self.source = source
+        self.preroll_seconds = preroll_seconds
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_every = recalibrate_every
+        self.energy_ratio = energy_ratio
+        self.min_threshold = min_threshold
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.preroll = None
+        # SpeechRecognition's default until the first calibration finishes
+        self.energy_threshold = 300
+        self.calibrated = threading.Event()
+        self.ambient = []
+        self.last_calibration = 0.0
+        self.thread = None
+        self.running = False
+        self.recordings = 0
+        self.calibrations = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.source.open()
+            self.sample_rate = self.source.sample_rate
+            self.sample_width = self.source.sample_width
+            chunk_seconds = self.source.chunk / self.sample_rate
+            self.preroll = deque(maxlen=max(1, math.ceil(self.preroll_seconds / chunk_seconds)))
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="capture", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        try:
+            while self.running:
+                data = self.source.read()
+                if not data:
+                    break
+                with self.lock:
+                    self.preroll.append(data)
+                    for subscriber in self.subscribers:
+                        subscriber.put(data)
+                    if not self.subscribers:
+                        self._calibrate(data)
+        except Exception as e:
+            logging.error(f"Audio capture stopped: {e}")
+        finally:
+            self.running = False
+            self.source.close()
+            with self.lock:
+                for subscriber in self.subscribers:
+                    subscriber.put(b"")
+            # Nobody should wait for a calibration that can no longer happen
+            self.calibrated.set()
+
+    # Collects ambient chunks while idle (called with the lock held) and turns calibration_seconds of them into a threshold
+    def _calibrate(self, data):
+        now = time.monotonic()
+        if self.calibrated.is_set() and now - self.last_calibration < self.recalibrate_every:
+            return
+        self.ambient.append(frame_rms(data, self.sample_width))
+        if len(self.ambient) * self.source.chunk / self.sample_rate < self.calibration_seconds:
+            return
+        ambient = sum(self.ambient) / len(self.ambient)
+        self.ambient = []
+        self.energy_threshold = max(self.min_threshold, ambient * self.energy_ratio)
+        self.last_calibration = now
+        self.calibrations += 1
+        self.calibrated.set()
+
+    # Yields read_chunk(), which returns the pre-roll and then live audio, and b"" once the source ends.
+    # Several recordings can share the stream; each gets its own copy of the audio.
+    @contextmanager
+    def recording(self, timeout=5.0):
+        self.start()
+        self.calibrated.wait(self.calibration_seconds + timeout)
+        subscriber = queue.Queue()
+        with self.lock:
+            for data in self.preroll:
+                subscriber.put(data)
+            if self.running:
+                self.subscribers.append(subscriber)
+                self.ambient = []
+            else:
+                subscriber.put(b"")
+            self.recordings += 1
+
+        def read_chunk():
+            try:
+                return subscriber.get(timeout=timeout)
+            except queue.Empty:
+                return b""
+
+        try:
+            yield read_chunk
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "running": self.running,
+                "energy_threshold": round(self.energy_threshold, 1),
+                "calibrations": self.calibrations,
+                "recordings": self.recordings,
+                "active_recordings": len(self.subscribers),
+            }
@@ -0,0 +1,79 @@
+import os
+
+# .env has to be loaded before any setting below is read; python-dotenv itself is cheap to import
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY1")
+
+# Directory for the app's local stores (audio cache, prompt pool, progress data).
+# Resolved relative to the app folder so it doesn't depend on the working directory.
+DATA_DIR = os.getenv("FLUENTFLOW_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+# Byte budgets for the text-to-speech cache tiers
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", 256 * 1024 * 1024))
+
+# SQLite database holding progress scores
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH", os.path.join(DATA_DIR, "progress.db"))
+# Legacy CSV written by earlier versions; imported once into the database on startup
+LEGACY_PROGRESS_CSV = os.getenv("LEGACY_PROGRESS_CSV", "progress.csv")
+
+# Token budget for one Daily Practice request; older turns beyond it are summarized
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", 2000))
+
+# Chat audio kept on disk per session: byte quota per session and idle time before cleanup
+AUDIO_SESSION_QUOTA_BYTES = int(os.getenv("AUDIO_SESSION_QUOTA_BYTES", 20 * 1024 * 1024))
+AUDIO_TTL_SECONDS = int(os.getenv("AUDIO_TTL_SECONDS", 24 * 60 * 60))
+
+# Shared HTTP pool for OpenAI calls, sized for many concurrent sessions
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 50))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 20))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+# Timeout budget in seconds per type of call
+LLM_CALL_TIMEOUTS = {
+    "default": 20.0,
+    "chat": float(os.getenv("LLM_TIMEOUT_CHAT", 20)),
+    "evaluation": float(os.getenv("LLM_TIMEOUT_EVALUATION", 30)),
+    "summary": float(os.getenv("LLM_TIMEOUT_SUMMARY", 10)),
+    "prompt": float(os.getenv("LLM_TIMEOUT_PROMPT", 10)),
+    "tips": float(os.getenv("LLM_TIMEOUT_TIPS", 15)),
+}
+# Show the service status panel (connection pool usage) in the sidebar
+SHOW_DIAGNOSTICS = os.getenv("SHOW_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+
+# Account quota the request scheduler budgets against, and the share kept free for interactive calls
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 200000))
+LLM_BACKGROUND_RESERVE = float(os.getenv("LLM_BACKGROUND_RESERVE", 0.2))
+# Output tokens assumed for a call without max_tokens when estimating its cost up front
+LLM_ESTIMATED_OUTPUT_TOKENS = int(os.getenv("LLM_ESTIMATED_OUTPUT_TOKENS", 400))
+
+# Retry and circuit breaker settings shared by every LLM call
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 3))
+LLM_RETRY_DEADLINE = float(os.getenv("LLM_RETRY_DEADLINE", 30))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))
+
+# Exact-match cache for idempotent LLM calls (progress tips); chat is never cached
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.db"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 24 * 60 * 60))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 256))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", 5000))
+
+# Speech-to-text engine: "google" (online) or "vosk" (offline; needs `pip install vosk` and a model
+# unpacked at VOSK_MODEL_PATH, e.g. vosk-model-small-en-us from https://alphacephei.com/vosk/models)
+STT_ENGINE = os.getenv("STT_ENGINE", "google").lower()
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join(DATA_DIR, "vosk-model"))
+STT_WORKERS = int(os.getenv("STT_WORKERS", 2))
+
+# Audio capture: seconds of audio kept from before Record is pressed, and how often the
+# ambient noise level is re-measured. CAPTURE_WAV replaces the microphone with a WAV file
+# (played in real time, looped), e.g. for tests or machines without an input device.
+CAPTURE_PREROLL_SECONDS = float(os.getenv("CAPTURE_PREROLL_SECONDS", 0.5))
+CAPTURE_RECALIBRATE_SECONDS = float(os.getenv("CAPTURE_RECALIBRATE_SECONDS", 60))
+CAPTURE_WAV = os.getenv("CAPTURE_WAV", "")
+# Microphone sample rate (mono, 16-bit); 16 kHz is what Vosk and Google's recognizer work at
+CAPTURE_SAMPLE_RATE = int(os.getenv("CAPTURE_SAMPLE_RATE", 16000))
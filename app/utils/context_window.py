@@ -0,0 +1,80 @@
+import functools
+import logging
+
+# Fixed per-message cost of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# tiktoken is optional and imported on first use; without it token counts fall back to a character estimate
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def message_tokens(message, model="gpt-3.5-turbo"):
+    return count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def new_memory():
+    return {"summary": "", "summarized": 0}
+
+
+# Function to build the messages for one request: the system prompt, a running summary of the older turns,
+# and the newest turns that fit in `budget` tokens.
+# `memory` is kept by the caller across turns ({"summary": str, "summarized": number of history messages covered}).
+# When the window overflows, the oldest turns are folded into the summary with summarize(summary, messages)
+# down to `refill_ratio` of the budget, so summarization runs once per batch of turns, not on every turn.
+def build_context(system_prompt, chat_history, memory, budget, summarize, refill_ratio=0.6, model="gpt-3.5-turbo"):
+    history = [{"role": msg["role"], "content": msg["content"]} for msg in chat_history]
+    if memory.get("summarized", 0) > len(history):
+        # The chat was reset underneath us; the old summary no longer applies
+        memory.update(new_memory())
+    summarized = memory.get("summarized", 0)
+    window = history[summarized:]
+
+    def total(summary, turns):
+        messages = _assemble(system_prompt, summary, turns, len(history))
+        return sum(message_tokens(message, model) for message in messages)
+
+    if total(memory["summary"], window) > budget:
+        target = budget * refill_ratio
+        cut = 0
+        # Always keep the latest message so the model has something to answer
+        while cut < len(window) - 1 and total(memory["summary"], window[cut:]) > target:
+            cut += 1
+        folded, window = window[:cut], window[cut:]
+        try:
+            memory["summary"] = summarize(memory["summary"], folded)
+            memory["summarized"] = summarized + cut
+        except Exception as e:
+            # Keep the request bounded anyway; the same turns are folded again on the next call
+            logging.error(f"Error summarizing {len(folded)} chat messages: {e}")
+
+    return _assemble(system_prompt, memory["summary"], window, len(history))
+
+
+def _assemble(system_prompt, summary, window, history_length):
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        # Older turns are no longer visible, so state the real length for prompts that depend on it
+        user_turns = (history_length + 1) // 2
+        messages.append({"role": "system", "content": (
+            f"Summary of the earlier part of this conversation: {summary}\n"
+            f"The full conversation so far has {history_length} messages (about {user_turns} from the user); "
+            "only the most recent ones are shown below."
+        )})
+    return messages + window
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+
+from utils.config import OPENAI_API_KEY, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY, \
+    LLM_CONNECT_TIMEOUT, LLM_CALL_TIMEOUTS, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_BACKGROUND_RESERVE, \
+    LLM_ESTIMATED_OUTPUT_TOKENS, LLM_MAX_ATTEMPTS, LLM_RETRY_DEADLINE, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET, \
+    LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_DISK_ENTRIES
+from utils.context_window import message_tokens
+from utils.scheduler import RequestScheduler, INTERACTIVE, BACKGROUND, retry_after_seconds
+from utils.resilience import CircuitBreaker, call_with_retries, metrics_snapshot
+from utils.response_cache import ResponseCache
+
+_client = None
+_transport = None
+_client_lock = threading.Lock()
+# Every completion in the process goes through this scheduler
+scheduler = RequestScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_BACKGROUND_RESERVE)
+# ...and trips this breaker when the upstream keeps failing
+breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+# Responses of call sites that pass cache=True
+response_cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_DISK_ENTRIES)
+# In the app a call waits for admission at most its timeout budget, so a user hears quickly that the quota
+# is exhausted. Headless runs set this to True: calls then queue for as long as the quota requires, and
+# the retry deadline no longer counts that queueing (attempts are still capped by LLM_MAX_ATTEMPTS).
+wait_for_admission = False
+
+
+# Function to get the timeout budget (seconds) for a type of LLM call, e.g. "chat", "evaluation", "tips"
+def call_timeout(call_type):
+    return LLM_CALL_TIMEOUTS.get(call_type, LLM_CALL_TIMEOUTS["default"])
+
+
+# Function to get the shared OpenAI client. It is built on first use around one explicitly sized
+# keep-alive pool, so every Streamlit session in the process reuses warm connections.
+def get_client():
+    global _client, _transport
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                import openai
+
+                _transport = _instrumented_transport(httpx)(
+                    http2=_http2_available(),
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                )
+                http_client = httpx.Client(
+                    transport=_transport,
+                    timeout=httpx.Timeout(call_timeout("default"), connect=LLM_CONNECT_TIMEOUT),
+                )
+                # Retries are handled by call_with_retries, not by the SDK's own loop
+                _client = openai.OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+    return _client
+
+
+# Function to run a chat completion through the scheduler and the retry/circuit-breaker layer.
+# `priority` is INTERACTIVE for calls a user is waiting on and BACKGROUND for deferrable work;
+# `call_type` selects the timeout budget and labels the metrics. With cache=True an identical earlier
+# request (same model, messages and parameters) is answered from response_cache without calling the API;
+# only use it for idempotent analysis calls, never for conversation turns.
+def create_completion(priority, call_type, client=None, cache=False, **kwargs):
+    if cache and not kwargs.get("stream"):
+        params = {name: value for name, value in kwargs.items() if name not in ("model", "messages")}
+        key = response_cache.make_key(kwargs["model"], kwargs["messages"], params)
+        cached = response_cache.get(key)
+        if cached is not None:
+            from openai.types.chat import ChatCompletion
+
+            return ChatCompletion.model_validate_json(cached)
+        response = create_completion(priority, call_type, client=client, **kwargs)
+        response_cache.put(key, response.model_dump_json())
+        return response
+
+    client = client or get_client()
+    estimate = sum(message_tokens(message) for message in kwargs["messages"]) + \
+        kwargs.get("max_tokens", LLM_ESTIMATED_OUTPUT_TOKENS)
+
+    def attempt():
+        import openai
+
+        ticket = scheduler.acquire(priority, estimate, timeout=None if wait_for_admission else call_timeout(call_type))
+        try:
+            response = client.chat.completions.create(timeout=call_timeout(call_type), **kwargs)
+        except openai.RateLimitError as e:
+            scheduler.penalize(retry_after_seconds(e))
+            raise
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            scheduler.settle(ticket, usage.total_tokens)
+        return response
+
+    return call_with_retries(attempt, call_type, breaker, classify_error, max_attempts=LLM_MAX_ATTEMPTS,
+                             deadline=float("inf") if wait_for_admission else LLM_RETRY_DEADLINE)
+
+
+# Function to decide how the retry layer treats an exception from the SDK
+def classify_error(error):
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        # An exhausted billing quota won't recover on retry; a 429 waits out Retry-After in the scheduler
+        return "fail" if getattr(error, "code", None) == "insufficient_quota" else "retry_now"
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return "retry"
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return "retry"
+    return "fail"
+
+
+# Function to report retry counters per call type and the circuit breaker state
+def resilience_stats():
+    return {"breaker": breaker.stats(), "calls": metrics_snapshot()}
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401  (httpx needs the h2 package for HTTP/2)
+        return True
+    except ImportError:
+        return False
+
+
+# Builds an HTTPTransport subclass that counts requests, in-flight requests and transport errors
+def _instrumented_transport(httpx):
+    class InstrumentedTransport(httpx.HTTPTransport):
+        def __init__(self, http2, limits):
+            super().__init__(http2=http2, limits=limits)
+            self.http2 = http2
+            self.limits = limits
+            self.stats_lock = threading.Lock()
+            self.requests = 0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.errors = 0
+            self.total_wait = 0.0
+
+        def handle_request(self, request):
+            started = time.perf_counter()
+            with self.stats_lock:
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return super().handle_request(request)
+            except Exception:
+                with self.stats_lock:
+                    self.errors += 1
+                raise
+            finally:
+                # Counted until response headers arrive; streamed bodies are read after this
+                with self.stats_lock:
+                    self.in_flight -= 1
+                    self.total_wait += time.perf_counter() - started
+
+    return InstrumentedTransport
+
+
+# Function to report pool usage and request counters; {"initialized": False} until the first call
+def client_stats():
+    transport = _transport
+    if transport is None:
+        return {"initialized": False}
+    connections = getattr(getattr(transport, "_pool", None), "connections", None)
+    stats = {
+        "initialized": True,
+        "http2": transport.http2,
+        "max_connections": transport.limits.max_connections,
+        "max_keepalive_connections": transport.limits.max_keepalive_connections,
+    }
+    with transport.stats_lock:
+        stats.update({
+            "requests": transport.requests,
+            "in_flight": transport.in_flight,
+            "peak_in_flight": transport.peak_in_flight,
+            "errors": transport.errors,
+            "mean_time_to_headers": transport.total_wait / transport.requests if transport.requests else 0.0,
+        })
+    if connections is not None:
+        # httpcore internals; reported when available, skipped otherwise
+        try:
+            stats["open_connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+        except Exception as e:
+            logging.debug(f"Connection pool details unavailable: {e}")
+    return stats
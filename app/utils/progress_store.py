@@ -0,0 +1,286 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Same column schema as the original progress.csv
+csv_columns = ["date", "module", "Content", "Delivery", "Structure", "Language skills", "Creativity", "Communication", "Vocabulary", "Grammar"]
+score_columns = csv_columns[2:]
+
+DEFAULT_USER = "default"
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+# SQLite-backed progress storage. WAL mode lets page renders read while sessions write,
+# and every write is a single IMMEDIATE transaction so concurrent writers queue instead of interleaving.
+class ProgressStore:
+    def __init__(self, path, busy_timeout=30):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        # Write contention: time spent waiting for SQLite's write lock and holding it
+        self.stats_lock = threading.Lock()
+        self.writes = 0
+        self.busy_errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_hold = 0.0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._create_schema()
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        scores = ", ".join(f"{_quote(col)} INTEGER NOT NULL DEFAULT 0" for col in score_columns)
+        conn = self._connect()
+        conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS progress (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL DEFAULT '{DEFAULT_USER}',
+                date TEXT NOT NULL,
+                module TEXT NOT NULL,
+                {scores}
+            );
+            CREATE INDEX IF NOT EXISTS progress_user_date_module ON progress (user, date, module);
+            CREATE INDEX IF NOT EXISTS progress_user_id ON progress (user, id);
+            CREATE TABLE IF NOT EXISTS daily_aggregates (
+                user TEXT NOT NULL,
+                date TEXT NOT NULL,
+                module TEXT NOT NULL,
+                criterion TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user, date, module, criterion)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS batch_items (
+                key TEXT PRIMARY KEY,
+                user TEXT NOT NULL,
+                module TEXT NOT NULL,
+                feedback TEXT NOT NULL,
+                scores TEXT NOT NULL,
+                evaluated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS imports (
+                path TEXT PRIMARY KEY,
+                rows INTEGER NOT NULL,
+                imported_at TEXT NOT NULL
+            );
+        """)
+        # Measured speech/text metrics (JSON) were added after the first release
+        if "metrics" not in [row[1] for row in conn.execute("PRAGMA table_info(progress)")]:
+            conn.execute("ALTER TABLE progress ADD COLUMN metrics TEXT")
+        # Databases created before the aggregates existed get them rebuilt once from the raw rows
+        has_rows = conn.execute("SELECT 1 FROM progress LIMIT 1").fetchone()
+        has_aggregates = conn.execute("SELECT 1 FROM daily_aggregates LIMIT 1").fetchone()
+        if has_rows and not has_aggregates:
+            self._write([("DELETE FROM daily_aggregates", ())] + [
+                (f"""INSERT INTO daily_aggregates (user, date, module, criterion, total, count)
+                     SELECT user, date, module, ?, SUM({_quote(col)}), COUNT(*) FROM progress
+                     GROUP BY user, date, module""", (col,))
+                for col in score_columns
+            ])
+
+    # Runs the statements in one write transaction. If `unless` is given as (sql, params) and returns a
+    # row once the write lock is held, nothing is written and False is returned.
+    def _write(self, statements, unless=None):
+        conn = self._connect()
+        started = time.perf_counter()
+        try:
+            # Waits up to busy_timeout while another connection holds the write lock
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            with self.stats_lock:
+                self.busy_errors += 1
+            raise
+        locked = time.perf_counter()
+        try:
+            if unless is not None and conn.execute(*unless).fetchone():
+                conn.execute("ROLLBACK")
+                return False
+            for sql, params in statements:
+                if isinstance(params, list):
+                    conn.executemany(sql, params)
+                else:
+                    conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            with self.stats_lock:
+                self.writes += 1
+                self.total_wait += locked - started
+                self.max_wait = max(self.max_wait, locked - started)
+                self.total_hold += time.perf_counter() - locked
+
+    # Write transactions so far, with the time spent waiting for and holding the write lock (seconds)
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "writes": self.writes,
+                "busy_errors": self.busy_errors,
+                "mean_lock_wait": self.total_wait / self.writes if self.writes else 0.0,
+                "max_lock_wait": self.max_wait,
+                "total_lock_wait": self.total_wait,
+                "mean_lock_hold": self.total_hold / self.writes if self.writes else 0.0,
+            }
+
+    def _insert_statements(self, rows):
+        columns = ["user"] + csv_columns
+        sql = (f"INSERT INTO progress ({', '.join(_quote(col) for col in columns)}, metrics) "
+               f"VALUES ({', '.join('?' for _ in columns)}, ?)")
+        params = [tuple(row.get(col, DEFAULT_USER if col == "user" else 0) for col in columns) +
+                  (json.dumps(row["metrics"]) if row.get("metrics") else None,) for row in rows]
+        # Running per-day/module/criterion sums are kept in step with the raw rows in the same transaction
+        aggregate_sql = """INSERT INTO daily_aggregates (user, date, module, criterion, total, count)
+                           VALUES (?, ?, ?, ?, ?, 1)
+                           ON CONFLICT (user, date, module, criterion)
+                           DO UPDATE SET total = total + excluded.total, count = count + 1"""
+        aggregate_params = [(values[0], values[1], values[2], col, values[3 + i])
+                            for values in params for i, col in enumerate(score_columns)]
+        return [(sql, params), (aggregate_sql, aggregate_params)]
+
+    # Inserts a batch of rows (dicts keyed by csv_columns, plus optional "user" and "metrics") in one transaction
+    def insert_rows(self, rows):
+        if rows:
+            self._write(self._insert_statements(rows))
+
+    # Per-day mean of every criterion, computed from the running aggregates (one row per day)
+    def daily_scores(self, user=None):
+        import pandas as pd
+
+        where, params = ("WHERE user = ?", (user,)) if user is not None else ("", ())
+        df = pd.read_sql_query(f"""SELECT date, criterion, CAST(SUM(total) AS REAL) / SUM(count) AS score
+                                   FROM daily_aggregates {where}
+                                   GROUP BY date, criterion""", self._connect(), params=params)
+        if df.empty:
+            return pd.DataFrame(columns=score_columns)
+        daily = df.pivot(index="date", columns="criterion", values="score").reindex(columns=score_columns)
+        daily.index = pd.to_datetime(daily.index)
+        return daily.sort_index()
+
+    # Per-day, per-module mean of every criterion, with the number of sessions behind it
+    def module_daily_scores(self, user=None):
+        import pandas as pd
+
+        where, params = ("WHERE user = ?", (user,)) if user is not None else ("", ())
+        df = pd.read_sql_query(f"""SELECT date, module, criterion, CAST(SUM(total) AS REAL) / SUM(count) AS score,
+                                          SUM(count) AS sessions
+                                   FROM daily_aggregates {where}
+                                   GROUP BY date, module, criterion""", self._connect(), params=params)
+        if df.empty:
+            return pd.DataFrame(columns=["date", "module", "sessions"] + score_columns)
+        table = df.pivot_table(index=["date", "module"], columns="criterion", values="score").reindex(columns=score_columns)
+        table.insert(0, "sessions", df.groupby(["date", "module"])["sessions"].max())
+        return table.reset_index().sort_values(["date", "module"], ascending=[False, True])
+
+    def has_rows(self, user):
+        return self._connect().execute("SELECT 1 FROM progress WHERE user = ? LIMIT 1", (user,)).fetchone() is not None
+
+    # The most recent rows, newest last, read through the (user, id) index
+    def recent(self, limit=5, user=None):
+        import pandas as pd
+
+        columns = ", ".join(_quote(col) for col in csv_columns)
+        where, params = ("WHERE user = ?", (user, limit)) if user is not None else ("", (limit,))
+        df = pd.read_sql_query(f"SELECT {columns} FROM progress {where} ORDER BY id DESC LIMIT ?",
+                               self._connect(), params=params)
+        return df.iloc[::-1].reset_index(drop=True)
+
+    # Measured metrics of the most recent rows that have them, one column per metric, newest last
+    def recent_metrics(self, limit=20, user=None, module=None):
+        import pandas as pd
+
+        where, params = ["metrics IS NOT NULL"], []
+        if user is not None:
+            where.append("user = ?")
+            params.append(user)
+        if module is not None:
+            where.append("module = ?")
+            params.append(module)
+        rows = self._connect().execute(
+            f"SELECT date, module, metrics FROM progress WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?",
+            params + [limit]).fetchall()
+        records = [{"date": date, "module": module, **json.loads(metrics)} for date, module, metrics in reversed(rows)]
+        return pd.DataFrame.from_records(records)
+
+    # Keys among `keys` whose batch evaluation is already stored
+    def completed_batch_keys(self, keys):
+        keys = list(keys)
+        conn = self._connect()
+        done = set()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(f"SELECT key FROM batch_items WHERE key IN ({', '.join('?' for _ in chunk)})", chunk)
+            done.update(key for (key,) in rows)
+        return done
+
+    # Stores a batch-evaluated item: the progress row (with aggregates) and its feedback in one transaction,
+    # so an interrupted run never leaves a scored item that would be evaluated and billed again. An item
+    # that is already stored is skipped and False is returned.
+    def record_batch_item(self, key, row, feedback):
+        statements = self._insert_statements([row])
+        scores = {col: row.get(col, 0) for col in score_columns}
+        statements.append(("INSERT INTO batch_items (key, user, module, feedback, scores, evaluated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, row.get("user", DEFAULT_USER), row["module"], feedback, json.dumps(scores),
+                            datetime.now().isoformat(timespec="seconds"))))
+        return self._write(statements, unless=("SELECT 1 FROM batch_items WHERE key = ?", (key,)))
+
+    # One-shot import of a legacy progress.csv; a file that was already imported is skipped
+    def import_csv(self, csv_path, user=DEFAULT_USER):
+        csv_path = os.path.abspath(csv_path)
+        rows = []
+        with open(csv_path, newline="") as f:
+            for record in csv.DictReader(f):
+                row = {"user": user, "date": record["date"], "module": record["module"]}
+                for col in score_columns:
+                    try:
+                        row[col] = int(float(record.get(col) or 0))
+                    except ValueError:
+                        row[col] = 0
+                rows.append(row)
+        statements = self._insert_statements(rows) if rows else []
+        statements.append(("INSERT OR IGNORE INTO imports (path, rows, imported_at) VALUES (?, ?, ?)",
+                           (csv_path, len(rows), datetime.now().isoformat(timespec="seconds"))))
+        # Checked under the write lock so two processes importing the same file can't both insert it
+        if not self._write(statements, unless=("SELECT 1 FROM imports WHERE path = ?", (csv_path,))):
+            return 0
+        logging.info(f"Imported {len(rows)} progress rows from {csv_path}")
+        return len(rows)
+
+
+def main():
+    from utils.config import PROGRESS_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Import legacy progress.csv files into the progress store.")
+    parser.add_argument("csv_files", nargs="+", help="progress.csv files to import")
+    parser.add_argument("--db", default=PROGRESS_DB_PATH, help="progress database path")
+    parser.add_argument("--user", default=DEFAULT_USER, help="user the imported rows belong to")
+    args = parser.parse_args()
+
+    store = ProgressStore(args.db)
+    for csv_path in args.csv_files:
+        count = store.import_csv(csv_path, user=args.user)
+        print(f"{csv_path}: {count} rows imported")
+
+
+if __name__ == "__main__":
+    main()
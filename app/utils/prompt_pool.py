@@ -0,0 +1,125 @@
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+
+# Per-activity pool of ready-to-serve prompts, refilled by a background worker.
+# `generate(activity)` must return a prompt or raise; error strings must never end up in the pool.
+class PromptPool:
+    def __init__(self, generate, activities, path, low_water=3, capacity=6, similarity=0.8, history=50):
+        self.generate = generate
+        self.activities = list(activities)
+        self.path = path
+        self.low_water = low_water
+        self.capacity = capacity
+        self.similarity = similarity
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.worker = None
+        self.pools = {activity: deque() for activity in self.activities}
+        # Recently served prompts, so a refill doesn't bring back something a learner just saw
+        self.served = {activity: deque(maxlen=history) for activity in self.activities}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading prompt pool from {self.path}: {e}")
+            return
+        for activity in self.activities:
+            entry = saved.get(activity, {})
+            self.pools[activity].extend(entry.get("ready", [])[:self.capacity])
+            self.served[activity].extend(entry.get("served", []))
+
+    def _save(self):
+        with self.lock:
+            saved = {activity: {"ready": list(self.pools[activity]), "served": list(self.served[activity])}
+                     for activity in self.activities}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error saving prompt pool to {self.path}: {e}")
+
+    def start(self):
+        with self.lock:
+            if self.worker is not None and self.worker.is_alive():
+                return
+            self.worker = threading.Thread(target=self._run, name="prompt-pool", daemon=True)
+            self.worker.start()
+
+    # Returns a ready prompt immediately, or None when the pool for this activity is empty
+    def pop(self, activity):
+        self.start()
+        with self.lock:
+            pool = self.pools.get(activity)
+            prompt = pool.popleft() if pool else None
+            if prompt is not None:
+                self.served[activity].append(prompt)
+                below_low_water = len(pool) < self.low_water
+        if prompt is None:
+            self.wake.set()
+            return None
+        if below_low_water:
+            self.wake.set()
+        self._save()
+        return prompt
+
+    # Records a prompt that was generated outside the pool so refills won't repeat it
+    def mark_served(self, activity, prompt):
+        with self.lock:
+            if activity in self.served:
+                self.served[activity].append(prompt)
+
+    def _is_near_duplicate(self, activity, prompt):
+        candidate = _normalize(prompt)
+        for existing in list(self.pools[activity]) + list(self.served[activity]):
+            if difflib.SequenceMatcher(None, candidate, _normalize(existing)).ratio() >= self.similarity:
+                return True
+        return False
+
+    def _run(self):
+        failures = 0
+        while True:
+            added = 0
+            for activity in self.activities:
+                with self.lock:
+                    missing = self.capacity - len(self.pools[activity]) if len(self.pools[activity]) < self.low_water else 0
+                # Duplicates are discarded, so allow a few extra attempts per refill
+                for _ in range(missing * 2):
+                    if missing == 0:
+                        break
+                    try:
+                        prompt = self.generate(activity).strip()
+                        failures = 0
+                    except Exception as e:
+                        failures += 1
+                        logging.error(f"Error prefetching prompt for {activity}: {e}")
+                        break
+                    with self.lock:
+                        if not prompt or self._is_near_duplicate(activity, prompt):
+                            logging.debug(f"Discarding near-duplicate prompt for {activity}: {prompt}")
+                            continue
+                        self.pools[activity].append(prompt)
+                    missing -= 1
+                    added += 1
+            if added:
+                self._save()
+            # Back off while the API is failing, otherwise sleep until a pop drains a pool
+            self.wake.wait(timeout=min(5 * 2 ** failures, 300) if failures else None)
+            self.wake.clear()
+
+
+def _normalize(prompt):
+    return re.sub(r"[^a-z0-9 ]", "", prompt.lower()).strip()
@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from collections import defaultdict
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+# Process-wide circuit breaker for the upstream API. After `failure_threshold` consecutive
+# upstream failures (timeouts, connection errors, 5xx) calls fail immediately for `reset_timeout`
+# seconds; then a single trial call is let through and its outcome closes or re-opens the circuit.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            raise CircuitOpen("The AI service is temporarily unavailable.")
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    # Releases a half-open trial whose call ended in an error that says nothing about upstream health
+    def record_neutral(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+# Retry counters per call type, exposed with the breaker state through resilience_stats()
+metrics = defaultdict(lambda: defaultdict(int))
+metrics_lock = threading.Lock()
+
+
+def _count(call_type, name):
+    with metrics_lock:
+        metrics[call_type][name] += 1
+
+
+# Function to run `call` with jittered exponential backoff and the circuit breaker.
+# classify(error) returns "retry" (transient, counts against upstream health), "retry_now"
+# (e.g. 429: the scheduler already delays the next attempt), or "fail". Backoff never pushes
+# past `deadline` seconds from the first attempt, so a user-facing call can't hang on retries.
+def call_with_retries(call, call_type, breaker, classify, max_attempts=3, base_delay=0.5, max_delay=4.0, deadline=30.0):
+    started = time.monotonic()
+    for attempt in range(1, max_attempts + 1):
+        try:
+            breaker.allow()
+        except CircuitOpen:
+            _count(call_type, "short_circuited")
+            raise
+        _count(call_type, "attempts")
+        try:
+            result = call()
+        except Exception as e:
+            kind = classify(e)
+            if kind == "retry":
+                breaker.record_failure()
+            else:
+                breaker.record_neutral()
+            delay = 0.0 if kind == "retry_now" else random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            if kind == "fail" or attempt == max_attempts or time.monotonic() - started + delay > deadline:
+                _count(call_type, "failures")
+                raise
+            _count(call_type, "retries")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        _count(call_type, "successes")
+        return result
+
+
+def metrics_snapshot():
+    with metrics_lock:
+        return {call_type: dict(counts) for call_type, counts in metrics.items()}
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Exact-match cache for LLM responses: an in-memory LRU tier in front of a SQLite table.
+# Entries expire after `ttl` seconds and each tier keeps at most a fixed number of entries.
+# Only call sites that opt in use it; a cached value is the serialized response, so callers
+# get back the same object shape as from a live call.
+class ResponseCache:
+    def __init__(self, path, ttl, max_memory_entries, max_disk_entries, busy_timeout=30):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.schema_ready = False
+
+    # Key over everything that determines the completion; request options such as timeouts are left out by the caller
+    @staticmethod
+    def make_key(model, messages, params):
+        payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self.schema_ready:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        accessed REAL NOT NULL
+                    ) WITHOUT ROWID;
+                    CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+                """)
+                self.schema_ready = True
+            self.local.conn = conn
+        return conn
+
+    # Returns the cached value for key, or None when it is missing or expired
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self.memory[key]
+
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] >= self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logging.error(f"Error reading response cache: {e}")
+            row = None
+
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, row[1], row[0])
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self.lock:
+            self._put_memory(key, now, value)
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                             (key, value, now, now))
+                conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+                conn.execute("""DELETE FROM responses WHERE key IN (
+                                    SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                             (self.max_disk_entries,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.error(f"Error writing response cache: {e}")
+
+    def _put_memory(self, key, created, value):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self.memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+            }
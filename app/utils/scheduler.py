@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+
+# Priorities: interactive calls (chat turns, feedback) always go first; background calls
+# (prompt prefetch, tips) only use what interactive traffic leaves over.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+WINDOW_SECONDS = 60.0
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+# Process-wide admission control in front of the OpenAI client. Tracks requests and tokens in a
+# sliding one-minute window, pauses everyone after a 429 until Retry-After has passed, and keeps a
+# reserve of the budget that only interactive calls may use.
+class RequestScheduler:
+    def __init__(self, requests_per_minute, tokens_per_minute, background_reserve=0.2):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.background_reserve = background_reserve
+        self.cond = threading.Condition()
+        self.window = deque()  # [timestamp, tokens] per admitted request
+        self.window_tokens = 0
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.paused_until = 0.0
+        self.admitted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.total_wait = {INTERACTIVE: 0.0, BACKGROUND: 0.0}
+        self.rate_limited = 0
+
+    # Blocks until the call fits in the budget and returns a ticket for settle(); raises QuotaExhausted
+    # if that would take longer than `timeout` seconds
+    def acquire(self, priority, tokens, timeout=None):
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self.cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._prune(now)
+                    wait = self._wait_time(priority, tokens, now)
+                    if wait <= 0:
+                        ticket = [now, tokens]
+                        self.window.append(ticket)
+                        self.window_tokens += tokens
+                        self.admitted[priority] += 1
+                        self.total_wait[priority] += now - started
+                        return ticket
+                    if deadline is not None and now + wait > deadline:
+                        raise QuotaExhausted(f"API quota is exhausted; the next slot opens in {wait:.1f}s.")
+                    self.cond.wait(wait if deadline is None else min(wait, deadline - now))
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+
+    def _prune(self, now):
+        while self.window and self.window[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self.window.popleft()
+            self.window_tokens -= tokens
+
+    def _wait_time(self, priority, tokens, now):
+        if now < self.paused_until:
+            return self.paused_until - now
+        share = 1.0
+        if priority == BACKGROUND:
+            if self.waiting[INTERACTIVE]:
+                # Re-checked as soon as the interactive caller is admitted (notify_all)
+                return 0.25
+            share = 1.0 - self.background_reserve
+        # A budget whose share rounds below one request, or a single call larger than the whole token
+        # budget, is let through on an empty window rather than never
+        fits_requests = len(self.window) + 1 <= self.requests_per_minute * share or not self.window
+        fits_tokens = self.window_tokens + tokens <= self.tokens_per_minute * share or not self.window
+        if fits_requests and fits_tokens:
+            return 0
+        return max(self.window[0][0] + WINDOW_SECONDS - now, 0.01)
+
+    # Replaces the estimate recorded for a call with the tokens the API actually billed
+    def settle(self, ticket, tokens):
+        with self.cond:
+            if any(entry is ticket for entry in self.window):
+                self.window_tokens += tokens - ticket[1]
+            ticket[1] = tokens
+            self.cond.notify_all()
+
+    # Pauses all admissions after a 429 for the server-provided Retry-After (or a default)
+    def penalize(self, retry_after):
+        with self.cond:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            self._prune(time.monotonic())
+            return {
+                "requests_last_minute": len(self.window),
+                "tokens_last_minute": self.window_tokens,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "waiting": {"interactive": self.waiting[INTERACTIVE], "background": self.waiting[BACKGROUND]},
+                "admitted": {"interactive": self.admitted[INTERACTIVE], "background": self.admitted[BACKGROUND]},
+                "mean_wait": {
+                    "interactive": self.total_wait[INTERACTIVE] / self.admitted[INTERACTIVE] if self.admitted[INTERACTIVE] else 0.0,
+                    "background": self.total_wait[BACKGROUND] / self.admitted[BACKGROUND] if self.admitted[BACKGROUND] else 0.0,
+                },
+                "rate_limited": self.rate_limited,
+                "paused_for": max(self.paused_until - time.monotonic(), 0.0),
+            }
+
+
+# Function to read the server's Retry-After from a 429 (seconds or milliseconds headers)
+def retry_after_seconds(error, default=1.0):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except ValueError:
+            continue
+    return default
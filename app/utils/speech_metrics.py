@@ -0,0 +1,92 @@
+from utils.text_metrics import count_fillers
+
+
+# Function to split samples into overlapping frames without copying (rows of a strided view)
+def _frames(samples, frame_length, hop_length):
+    import numpy as np
+
+    return np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+
+
+# Function to estimate the pitch (Hz) of each frame by FFT autocorrelation; unvoiced frames are NaN.
+# Frames are processed in blocks to bound memory on long recordings.
+def _frame_pitch(frames, sample_rate, min_hz=75, max_hz=400, voicing=0.3, block=1024):
+    import numpy as np
+
+    min_lag, max_lag = int(sample_rate / max_hz), min(int(sample_rate / min_hz), frames.shape[1] - 1)
+    # Long enough that circular wrap-around can't reach the lags searched
+    size = 1 << int(np.ceil(np.log2(frames.shape[1] + max_lag)))
+    pitch = np.full(len(frames), np.nan, dtype=np.float32)
+    for start in range(0, len(frames), block):
+        chunk = frames[start:start + block]
+        chunk = chunk - chunk.mean(axis=1, keepdims=True)
+        spectrum = np.fft.rfft(chunk, n=size, axis=1)
+        autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :max_lag + 1]
+        energy = autocorr[:, 0]
+        lag = np.argmax(autocorr[:, min_lag:], axis=1) + min_lag
+        strength = autocorr[np.arange(len(chunk)), lag] / np.maximum(energy, 1e-12)
+        voiced = strength >= voicing
+        pitch[start:start + block][voiced] = sample_rate / lag[voiced]
+    return pitch
+
+
+# Function to measure pacing and prosody of a recording: mono PCM plus its transcript.
+# Speech/silence is decided per hop (frames span a whole number of hops) against a level set from
+# the recording's own noise floor;
+# pauses are silences of at least `min_pause` seconds between the first and last speech.
+def prosody_metrics(pcm, sample_rate, transcript, sample_width=2, frame_ms=40, hop_ms=20, min_pause=0.3):
+    import numpy as np
+
+    dtype = np.int16 if sample_width == 2 else np.int8
+    samples = np.frombuffer(pcm, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    frame_length = int(sample_rate * frame_ms / 1000)
+    hop_length = int(sample_rate * hop_ms / 1000)
+    hop_seconds = hop_length / sample_rate
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+
+    # Energy per hop, then per frame as the sum of its hops, so overlapping frames aren't squared twice
+    hops = samples[:len(samples) // hop_length * hop_length].reshape(-1, hop_length)
+    hop_energy = np.einsum("ij,ij->i", hops, hops)
+    per_frame = frame_length // hop_length
+    frame_energy = np.convolve(hop_energy, np.ones(per_frame, dtype=np.float32), "valid")
+    rms_db = 10 * np.log10(frame_energy / (per_frame * hop_length) + 1e-12)
+    threshold = max(np.percentile(rms_db, 10) + 12, rms_db.max() - 40)
+    speech = rms_db > threshold
+    fillers, words = count_fillers(transcript)
+    metrics = {"duration_seconds": round(len(samples) / sample_rate, 1), "words": words}
+    if not speech.any():
+        return metrics
+
+    first, last = np.flatnonzero(speech)[[0, -1]]
+    span = speech[first:last + 1]
+    speaking_seconds = len(span) * hop_seconds
+    # Run lengths of silence inside the speaking span
+    edges = np.diff(np.concatenate(([0], (~span).astype(np.int8), [0])))
+    silences = (np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)) * hop_seconds
+    pauses = silences[silences >= min_pause]
+
+    # Pitch only needs non-overlapping windows, and 8 kHz covers the voice range: every other
+    # voiced frame of a signal averaged down to ~8 kHz keeps the FFT work small
+    factor = max(1, sample_rate // 8000)
+    decimated = sum(samples[offset::factor][:len(samples) // factor] for offset in range(factor)) / factor
+    frames = _frames(decimated, frame_length // factor, hop_length // factor)[:len(rms_db)]
+    voiced_frames = frames[first:last + 1][span[:len(frames) - first]][::2]
+    pitch = _frame_pitch(voiced_frames, sample_rate / factor)
+    pitch = pitch[~np.isnan(pitch)]
+    semitones = 12 * np.log2(pitch / np.median(pitch)) if len(pitch) else pitch
+
+    metrics.update({
+        "speaking_seconds": round(speaking_seconds, 1),
+        "words_per_minute": round(words / (speaking_seconds / 60), 1) if speaking_seconds else 0.0,
+        "pauses": int(len(pauses)),
+        "mean_pause_seconds": round(float(pauses.mean()), 2) if len(pauses) else 0.0,
+        "longest_pause_seconds": round(float(pauses.max()), 2) if len(pauses) else 0.0,
+        "pause_ratio": round(float(pauses.sum()) / speaking_seconds, 2),
+        "fillers": fillers,
+        "fillers_per_100_words": round(100 * fillers / words, 1) if words else 0.0,
+        "energy_variation_db": round(float(rms_db[first:last + 1][span].std()), 1),
+        "pitch_mean_hz": round(float(np.median(pitch)), 1) if len(pitch) else None,
+        "pitch_variation_semitones": round(float(semitones.std()), 2) if len(pitch) else None,
+    })
+    return metrics
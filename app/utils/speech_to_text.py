@@ -0,0 +1,97 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.config import STT_ENGINE, VOSK_MODEL_PATH, STT_WORKERS
+
+
+class NotUnderstood(Exception):
+    pass
+
+
+class EngineUnavailable(Exception):
+    pass
+
+
+_vosk_model = None
+_vosk_lock = threading.Lock()
+# Transcriptions from every session run here, so a long recording doesn't hold the script thread
+# and several sessions can transcribe at the same time
+stt_executor = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+
+
+# Function to load the Vosk model once per process; it is a few hundred MB and takes seconds to load
+def _get_vosk_model():
+    global _vosk_model
+    if _vosk_model is None:
+        with _vosk_lock:
+            if _vosk_model is None:
+                try:
+                    import vosk
+                except ImportError:
+                    raise EngineUnavailable("the vosk package is not installed (pip install vosk)")
+                try:
+                    vosk.SetLogLevel(-1)
+                    _vosk_model = vosk.Model(VOSK_MODEL_PATH)
+                except Exception as e:
+                    raise EngineUnavailable(f"could not load the Vosk model from {VOSK_MODEL_PATH}: {e}")
+    return _vosk_model
+
+
+# Offline engine: a recognizer per call over the shared model, which Vosk allows from several threads
+def _transcribe_vosk(pcm, sample_rate, sample_width):
+    import vosk
+
+    if sample_width != 2:
+        raise EngineUnavailable("Vosk needs 16-bit audio")
+    recognizer = vosk.KaldiRecognizer(_get_vosk_model(), sample_rate)
+    recognizer.AcceptWaveform(pcm)
+    return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+# Online engine: Google's free web speech API through SpeechRecognition
+def _transcribe_google(pcm, sample_rate, sample_width):
+    import speech_recognition as sr
+
+    audio = sr.AudioData(pcm, sample_rate, sample_width)
+    try:
+        return sr.Recognizer().recognize_google(audio)
+    except sr.UnknownValueError:
+        return ""
+    except sr.RequestError as e:
+        raise EngineUnavailable(str(e))
+
+
+engines = {"vosk": _transcribe_vosk, "google": _transcribe_google}
+
+
+# Function to transcribe raw mono PCM with the configured engine (or `engine`).
+# Raises NotUnderstood when no words were recognized and EngineUnavailable when the engine can't run.
+def transcribe(pcm, sample_rate, sample_width=2, engine=None):
+    engine = engine or STT_ENGINE
+    if engine not in engines:
+        raise EngineUnavailable(f"unknown speech-to-text engine {engine!r}")
+    text = engines[engine](pcm, sample_rate, sample_width).strip()
+    if not text:
+        raise NotUnderstood()
+    return text
+
+
+# Function to queue a transcription on the shared worker pool; returns a future for the text
+def submit_transcription(pcm, sample_rate, sample_width=2, engine=None):
+    return stt_executor.submit(transcribe, pcm, sample_rate, sample_width, engine)
+
+
+# Function to load the local model in the background at startup, so the first recording doesn't wait for it
+def warm_up():
+    if STT_ENGINE != "vosk":
+        return
+
+    def load():
+        try:
+            _get_vosk_model()
+        except EngineUnavailable as e:
+            logging.error(f"Speech-to-text unavailable: {e}")
+
+    stt_executor.submit(load)
@@ -0,0 +1,127 @@
+import argparse
+import json
+import re
+import statistics
+import sys
+from collections import Counter
+
+# Disfluencies and filler phrases counted in responses and transcripts. Words like "like", "so" or
+# "actually", and phrases like "kind of" ("a kind of bird"), are left out: they are fillers only in
+# some contexts, and counting every use penalizes clean answers.
+filler_words = {"um", "umm", "uh", "uhh", "er", "erm", "ah", "hmm"}
+filler_phrases = re.compile(r"\b(?:you know|i mean)\b")
+word_pattern = re.compile(r"[a-z']+")
+sentence_pattern = re.compile(r"[^.!?]+[.!?]*")
+vowel_groups = re.compile(r"[aeiouy]+")
+
+# Window for the moving-average type-token ratio, which unlike plain TTR doesn't fall as texts get longer
+TTR_WINDOW = 50
+
+
+# Function to count filler words and phrases in a transcript; returns (fillers, words)
+def count_fillers(text):
+    lowered = text.lower()
+    words = word_pattern.findall(lowered)
+    return _fillers(lowered, words), len(words)
+
+
+def _fillers(lowered, words):
+    return sum(1 for word in words if word in filler_words) + len(filler_phrases.findall(lowered))
+
+
+def _syllables(word):
+    count = len(vowel_groups.findall(word))
+    if word.endswith("e") and not word.endswith("le") and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+def _moving_ttr(words):
+    if len(words) <= TTR_WINDOW:
+        return len(set(words)) / len(words)
+    counts = Counter(words[:TTR_WINDOW])
+    total = len(counts)
+    for new, old in zip(words[TTR_WINDOW:], words):
+        counts[new] += 1
+        counts[old] -= 1
+        if not counts[old]:
+            del counts[old]
+        total += len(counts)
+    return total / (len(words) - TTR_WINDOW + 1) / TTR_WINDOW
+
+
+# Function to measure one response: vocabulary variety, sentence lengths, Flesch reading ease,
+# fillers and repetition. Sentence statistics are left out for long unpunctuated text (raw
+# speech transcripts), where they would describe the recognizer rather than the speaker.
+def text_metrics(text):
+    lowered = text.lower()
+    words = word_pattern.findall(lowered)
+    if not words:
+        return {"words": 0}
+    fillers = _fillers(lowered, words)
+    trigrams = Counter(zip(words, words[1:], words[2:]))
+    metrics = {
+        "words": len(words),
+        "type_token_ratio": round(_moving_ttr(words), 3),
+        "fillers": fillers,
+        "fillers_per_100_words": round(100 * fillers / len(words), 1),
+        # Word-for-word echoes: the same word twice in a row, and three-word phrases used more than once
+        "repeated_words": sum(1 for a, b in zip(words, words[1:]) if a == b),
+        "repeated_phrases": sum(count - 1 for count in trigrams.values() if count > 1),
+    }
+
+    sentences = [word_pattern.findall(s) for s in sentence_pattern.findall(lowered)]
+    lengths = [len(s) for s in sentences if s]
+    punctuated = bool(re.search(r"[.!?]", text))
+    if lengths and (punctuated or len(words) <= 40):
+        syllables = sum(_syllables(word) for word in words)
+        metrics.update({
+            "sentences": len(lengths),
+            "mean_sentence_words": round(statistics.mean(lengths), 1),
+            "sentence_words_stdev": round(statistics.pstdev(lengths), 1),
+            "longest_sentence_words": max(lengths),
+            "reading_ease": round(206.835 - 1.015 * len(words) / len(lengths) - 84.6 * syllables / len(words), 1),
+        })
+    return metrics
+
+
+# Function to measure the user's side of a chat: per-turn length stats plus text_metrics over all their turns
+def chat_metrics(chat_history):
+    turns = [msg["content"] for msg in chat_history if msg["role"] == "user"]
+    if not turns:
+        return {"user_turns": 0}
+    lengths = [len(word_pattern.findall(turn.lower())) for turn in turns]
+    metrics = {
+        "user_turns": len(turns),
+        "mean_turn_words": round(statistics.mean(lengths), 1),
+        "shortest_turn_words": min(lengths),
+        "longest_turn_words": max(lengths),
+        "one_line_turns": sum(1 for length in lengths if length < 5),
+    }
+    metrics.update(text_metrics(" ".join(turn.strip().rstrip(".!?") + "." for turn in turns)))
+    return metrics
+
+
+# Function to render metrics as compact "name: value" lines for an evaluation prompt
+def format_metrics(metrics):
+    return "\n".join(f"- {name.replace('_', ' ')}: {value}" for name, value in metrics.items() if value is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute text metrics for transcripts.")
+    parser.add_argument("files", nargs="*", help="text files, one response each (reads JSON lines with a \"text\" field from stdin if none)")
+    args = parser.parse_args()
+
+    if args.files:
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                print(json.dumps({"file": path, **text_metrics(f.read())}))
+    else:
+        for line in sys.stdin:
+            if line.strip():
+                record = json.loads(line)
+                print(json.dumps({**record, "metrics": text_metrics(record["text"])}))
+
+
+if __name__ == "__main__":
+    main()
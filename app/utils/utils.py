@@ -1,131 +1,428 @@
-import speech_recognition as sr
 import io
-import wave
-from gtts import gTTS
 import streamlit as st
 import logging
-import csv
+import json
 import os
 from datetime import datetime
-from dotenv import load_dotenv
-import openai
-from openai import RateLimitError, APIError, AuthenticationError
-import requests
-import time
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_cache import AudioCache
+from utils.prompt_pool import PromptPool
+from utils.context_window import build_context, new_memory
+from utils.blob_store import BlobStore
+from utils.speech_to_text import submit_transcription, warm_up, NotUnderstood, EngineUnavailable
+from utils.voice_capture import Segmenter, StreamingTranscript, capture
+from utils.capture_service import CaptureService, MicrophoneSource, WavSource
+from utils.speech_metrics import prosody_metrics
+from utils.text_metrics import text_metrics, chat_metrics, format_metrics
+from utils.llm_client import create_completion, client_stats, resilience_stats, response_cache, scheduler, INTERACTIVE, BACKGROUND
+from utils.scheduler import QuotaExhausted
+from utils.resilience import CircuitOpen
+from utils.progress_store import ProgressStore, csv_columns, DEFAULT_USER
+from utils.config import DATA_DIR, TTS_CACHE_MEMORY_BYTES, TTS_CACHE_DISK_BYTES, PROGRESS_DB_PATH, LEGACY_PROGRESS_CSV, CHAT_CONTEXT_TOKENS, \
+    AUDIO_SESSION_QUOTA_BYTES, AUDIO_TTL_SECONDS, CAPTURE_PREROLL_SECONDS, CAPTURE_RECALIBRATE_SECONDS, CAPTURE_WAV, \
+    CAPTURE_SAMPLE_RATE
 
 logging.basicConfig(level=logging.DEBUG)
 
-load_dotenv()
-openai_api_key1 = os.getenv("OPENAI_API_KEY1")
-client = openai.OpenAI(api_key=openai_api_key1)
+# Heavy dependencies (openai, requests, gtts, speech_recognition, pandas) are imported inside the
+# functions that use them, so loading a page doesn't pay for libraries it never calls.
+
+# Shared worker pool so the independent LLM calls of one submission overlap
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+# Progress scores live in SQLite; an existing progress.csv is imported the first time it is seen
+progress_store = ProgressStore(PROGRESS_DB_PATH)
+if os.path.isfile(LEGACY_PROGRESS_CSV):
+    progress_store.import_csv(LEGACY_PROGRESS_CSV)
+# Synthesized speech is cached per process, so every session shares greetings and repeated replies
+tts_cache = AudioCache(os.path.join(DATA_DIR, "tts_cache"), TTS_CACHE_MEMORY_BYTES, TTS_CACHE_DISK_BYTES)
+# Chat audio lives on disk; session state only holds handles into this store
+audio_store = BlobStore(os.path.join(DATA_DIR, "audio"), AUDIO_SESSION_QUOTA_BYTES, AUDIO_TTL_SECONDS)
+# The offline speech model (if configured) loads in the background instead of on the first recording
+warm_up()
+# The input stream stays open between recordings; see get_capture_service()
+capture_service = None
+capture_lock = threading.Lock()
+
+# Function to get the process-wide capture service, opening the input stream on first use
+def get_capture_service():
+    global capture_service
+    if capture_service is None:
+        with capture_lock:
+            if capture_service is None:
+                # Captured at the rate the recognizers want, so segments go to them as raw PCM without resampling
+                source = WavSource(CAPTURE_WAV, realtime=True, loop=True) if CAPTURE_WAV else \
+                    MicrophoneSource(sample_rate=CAPTURE_SAMPLE_RATE)
+                capture_service = CaptureService(source, preroll_seconds=CAPTURE_PREROLL_SECONDS,
+                                                 recalibrate_every=CAPTURE_RECALIBRATE_SECONDS)
+                capture_service.start()
+    return capture_service
+
+
+# Function to record audio and convert to text. Each pause in speech closes a segment that is transcribed
+# while recording continues, so the text is nearly complete when the speaker stops; `on_partial(text)`
+# receives the transcript so far as segments finish. Returns (audio_file, text, speech_metrics);
+# speech_metrics is None when nothing was understood.
+def record_and_convert(on_partial=None):
+    service = get_capture_service()
+    sample_rate, sample_width = service.sample_rate, service.sample_width
 
-# Function to record audio and convert to text
-def record_and_convert():
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
-    
     with st.spinner("Recording and processing your voice..."):
-        with mic as source:
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=120)
-        
-        audio_file = io.BytesIO()
-        with wave.open(audio_file, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(44100)
-            wf.writeframes(audio.get_wav_data())
-        audio_file.seek(0)
-        try:
-            text = recognizer.recognize_google(audio)
-            return audio_file, text
-        except sr.UnknownValueError:
-            return audio_file, "Sorry, I couldn't understand what you said."
-        except sr.RequestError as e:
-            return audio_file, f"Could not request results; {e}"
-
-# Function to convert text to speech (no speedup)
-def text_to_speech(text):
-    tts = gTTS(text=text, lang='en', slow=False)
+        with service.recording() as read_chunk:
+            segmenter = Segmenter(sample_rate, sample_width, energy_threshold=service.energy_threshold)
+            transcript = StreamingTranscript(lambda segment: submit_transcription(segment, sample_rate, sample_width))
+            pcm = capture(read_chunk, segmenter, transcript, on_partial, timeout=5, phrase_time_limit=120)
+
+        audio_file = encode_recording(pcm, sample_rate, sample_width)
+        text, understood = finish_transcript(transcript)
+        speech_metrics = measure_speech(pcm, sample_rate, sample_width, text) if understood else None
+        return audio_file, text, speech_metrics
+
+
+# Function to measure pacing and prosody of a recording; None if the analysis fails
+def measure_speech(pcm, sample_rate, sample_width, text):
+    try:
+        return prosody_metrics(pcm, sample_rate, text, sample_width)
+    except Exception as e:
+        logging.error(f"Error analysing recording: {e}")
+        return None
+
+
+# Function to compress a recording for playback and storage. FLAC is lossless and roughly halves
+# 16 kHz speech; the encoder binary ships with SpeechRecognition.
+def encode_recording(pcm, sample_rate, sample_width=2):
+    import speech_recognition as sr
+
+    return io.BytesIO(sr.AudioData(pcm, sample_rate, sample_width).get_flac_data())
+
+
+# Function to wait for the remaining segments; returns (text, understood), where failures become
+# the messages the pages check for
+def finish_transcript(transcript):
+    try:
+        return transcript.result(), True
+    except NotUnderstood:
+        return "Sorry, I couldn't understand what you said.", False
+    except EngineUnavailable as e:
+        return f"Could not request results; {e}", False
+
+
+# Function to convert text to speech (no speedup); identical requests are served from tts_cache
+def text_to_speech(text, lang='en', slow=False):
+    key = AudioCache.make_key(text, lang, slow)
+    data = tts_cache.get_or_create(key, lambda: synthesize_speech(text, lang, slow))
+    return io.BytesIO(data)
+
+
+def synthesize_speech(text, lang='en', slow=False):
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang=lang, slow=slow)
     audio_file = io.BytesIO()
     tts.write_to_fp(audio_file)
-    audio_file.seek(0)
-    return audio_file
+    return audio_file.getvalue()
+
+# Function to get the learner identity of this session; kept in the URL so a reload keeps the same history.
+# Must be called from the script thread.
+def current_user_id():
+    user_id = str(st.session_state.get("user_id") or "").strip()
+    if not user_id:
+        user_id = st.query_params.get("user") or uuid.uuid4().hex[:12]
+    # Only write when it changed: the sidebar widget owns this key once it has been drawn
+    if st.session_state.get("user_id") != user_id:
+        st.session_state.user_id = user_id
+    if st.query_params.get("user") != user_id:
+        st.query_params["user"] = user_id
+    return user_id
+
+
+# Function to report process-wide service health: LLM pool, quota and retry/breaker state, LLM response and
+# speech cache hit rates, and progress-store write contention
+def service_stats():
+    return {"llm_pool": client_stats(), "llm_scheduler": scheduler.stats(), "tts_cache": tts_cache.stats(),
+            "llm_resilience": resilience_stats(), "llm_cache": response_cache.stats(),
+            "progress_store": progress_store.stats(),
+            "audio_capture": capture_service.stats() if capture_service is not None else None}
+
+
+# Function to get the id of this browser session (script thread only); used to scope stored audio
+def current_session_id():
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+
+# Function to move audio out of session state: stores the bytes and returns a handle for load_audio()
+def store_audio(audio_file, fmt):
+    data = audio_file.getvalue() if hasattr(audio_file, "getvalue") else audio_file
+    return audio_store.put(current_session_id(), data, fmt)
+
+
+# Function to read stored audio back for playback; None once it has expired or been evicted
+def load_audio(handle):
+    return audio_store.get(handle)
+
 
-def save_progress_csv(date, module, scores):
-    csv_columns = ["date", "module", "Content", "Delivery", "Structure", "Language skills", "Creativity", "Communication", "Vocabulary", "Grammar"]
-    row = {"date": date, "module": module}
+def save_progress_csv(date, module, scores, user_id=DEFAULT_USER, metrics=None):
+    progress_store.insert_rows([progress_row(date, module, scores, user_id, metrics)])
+
+
+# Function to build a progress-store row from validated scores
+def progress_row(date, module, scores, user_id=DEFAULT_USER, metrics=None):
+    row = {"user": user_id, "date": date, "module": module, "metrics": metrics}
     for col in csv_columns[2:]:
         row[col] = scores.get(col.lower(), 0)
-    file_exists = os.path.isfile("progress.csv")
-    with open("progress.csv", "a", newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=csv_columns)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
-
-
-def daily_practice_chat_response(role, chat_history):
-    role_prompts = {
-        "Job Interviewer": """You are a professional HR interviewer conducting a structured job interview. 
-        Greet the candidate warmly with a brief self-introduction (e.g., 'Hi, I’m Alex, your interviewer today'). 
-        Ask one natural, relevant question at a time about their background, technical skills, behavioral responses, or problem-solving ability. 
-        Adapt your next question based on their response, keeping the conversation dynamic and engaging. 
-        If it’s the final turn (based on chat history length), provide concise, constructive feedback highlighting one strength and one area for improvement. 
-        Avoid reading a list; make it feel like a real interview.""",
-
-        "Debate Opponent": """You are a skilled debate opponent in a lively, thought-provoking discussion. 
-        If it’s the first turn, propose one interesting debate topic (e.g., 'Should social media be regulated?') and ask the user to pick a stance. 
-        Then, challenge their argument naturally with facts and reasoning, keeping the tone respectful yet engaging. 
-        Respond to their latest point in a smooth back-and-forth style, asking a thought-provoking question if they struggle. 
-        If they request it, switch sides and argue the opposite perspective. 
-        Avoid long monologues; keep it concise and dynamic.""",
-
-        "Casual Friend": """You are a friendly, casual conversational partner chatting like a close friend. 
-        Pick a fun, everyday topic (e.g., movies, travel, food, hobbies) or build on what they say, asking natural follow-ups to keep it flowing. 
-        Use a playful, relaxed tone with light humor. 
-        If their response sounds excited, match it with enthusiasm (e.g., 'No way, that’s awesome!'). 
-        If it hints at feeling down, offer supportive words (e.g., 'That sounds tough—want to talk about it?'). 
-        Keep it short, effortless, and enjoyable.""",
-
-        "custom":"""You are an AI communication assistant. Respond naturally based on the conversation context."""
-    }
-    max_retries = 3
-    for attempt in range(max_retries):
+    return row
+
+
+# Functions to read the incrementally maintained aggregates; cost grows with days, not sessions
+def load_daily_scores(user_id):
+    return progress_store.daily_scores(user_id)
+
+
+def load_module_daily_scores(user_id):
+    return progress_store.module_daily_scores(user_id)
+
+
+def has_progress(user_id):
+    return progress_store.has_rows(user_id)
+
+
+def load_recent_scores(user_id, limit=5):
+    return progress_store.recent(limit, user_id)
+
+
+# Function to load the locally measured text/speech metrics of one user's latest sessions
+def load_recent_metrics(user_id, limit=20):
+    return progress_store.recent_metrics(limit, user_id)
+
+
+# Appended to every evaluation prompt so one JSON-mode request returns both the report and the scores
+evaluation_format = (
+    " Respond with a JSON object with exactly two keys: "
+    "\"feedback\": your complete report as a Markdown string, and "
+    "\"scores\": an object with integer scores from 0 to 10 for "
+    "\"content\", \"delivery\", \"structure\", \"language skills\", \"creativity\", "
+    "\"communication\", \"vocabulary\" and \"grammar\". Use 0 for criteria not applicable to the activity."
+)
+score_keys = [col.lower() for col in csv_columns[2:]]
+# Appended to evaluation prompts that come with locally measured text metrics, so length, variety,
+# filler and repetition judgments rest on the same numbers every run
+metrics_guidance = (
+    " Locally measured metrics of the student's text are provided. Base your judgments of length, vocabulary "
+    "variety, fillers and repetition on these numbers and quote them (type-token ratio is a 50-word moving "
+    "average: above 0.7 is varied, below 0.5 is repetitive; reading ease 60-80 is plain conversational English)."
+)
+
+
+# Function to validate a score dict from the LLM; returns None instead of guessing when anything is missing or out of range
+def validate_scores(raw_scores):
+    if not isinstance(raw_scores, dict):
+        return None
+    normalized = {str(k).strip().lower().replace("_", " "): v for k, v in raw_scores.items()}
+    scores = {}
+    for key in score_keys:
+        value = normalized.get(key)
+        # float(True) is 1.0; a boolean is not a score
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, str):
+            value = value.split("/")[0].strip()
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": role_prompts[role]}] + 
-                         [{"role": msg["role"], "content": msg["content"]} for msg in chat_history],
-                timeout=20  
-            )
-            ai_response = response.choices[0].message.content.strip()
-            ai_audio = text_to_speech(ai_response)  
-            return ai_response, ai_audio
-        
-        except RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  
-                continue
-            return "Rate limit exceeded after retries. Please try again later.", None
-        except requests.Timeout:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not number.is_integer() or not 0 <= number <= 10:
+            return None
+        scores[key] = int(number)
+    return scores
+
+
+# Function to split a JSON-mode evaluation into (feedback, scores); scores is None when they don't validate
+def parse_evaluation(content):
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError) as e:
+        logging.error(f"Evaluation was not valid JSON: {e}. Raw response: {content}")
+        return content.strip(), None
+    feedback = data.get("feedback") if isinstance(data, dict) else None
+    if not isinstance(feedback, str) or not feedback.strip():
+        logging.error(f"Evaluation has no feedback text. Raw response: {content}")
+        return content.strip(), None
+    scores = validate_scores(data.get("scores"))
+    if scores is None:
+        logging.error(f"Evaluation scores failed validation. Raw response: {content}")
+    return feedback.strip(), scores
+
+
+# Function to store validated scores (and any measured metrics); a missing score set is skipped rather than recorded as zeros
+def record_scores(activity, scores, user_id, metrics=None):
+    if scores is None:
+        logging.warning(f"No valid scores for {activity}; progress row skipped")
+        return
+    try:
+        date = datetime.now().strftime("%Y-%m-%d")
+        save_progress_csv(date, activity, scores, user_id, metrics)
+    except Exception as e:
+        logging.error(f"Error saving progress scores for {activity}: {e}")
+
+
+# Function to turn an exception from an LLM call into the message shown to the user.
+# Retries and backoff already happened inside create_completion, so this only has to describe the failure.
+def error_message(e):
+    from openai import RateLimitError, APIError, APITimeoutError, APIConnectionError, AuthenticationError
+
+    if isinstance(e, CircuitOpen):
+        return "The AI service is having trouble right now. Please try again in a minute."
+    if isinstance(e, (QuotaExhausted, RateLimitError)):
+        return "Oops! We've hit the API rate limit. Please wait a moment and try again."
+    if isinstance(e, AuthenticationError):
+        return "Authentication error: Please check your API key and try again."
+    if isinstance(e, APITimeoutError):
+        return "The request timed out. Check your internet connection and try again."
+    if isinstance(e, APIConnectionError):
+        return "Could not reach the AI service. Check your internet connection and try again."
+    if isinstance(e, APIError):
+        return f"Server issue: {str(e)}. Please try again later."
+    return f"An unexpected error occurred: {str(e)}. Please try again or contact support."
+
+
+# System prompts for the Daily Practice conversation partners
+role_prompts = {
+    "Job Interviewer": """You are a professional HR interviewer conducting a structured job interview. 
+    Greet the candidate warmly with a brief self-introduction (e.g., 'Hi, I’m Alex, your interviewer today'). 
+    Ask one natural, relevant question at a time about their background, technical skills, behavioral responses, or problem-solving ability. 
+    Adapt your next question based on their response, keeping the conversation dynamic and engaging. 
+    If it’s the final turn (based on chat history length), provide concise, constructive feedback highlighting one strength and one area for improvement. 
+    Avoid reading a list; make it feel like a real interview.""",
+
+    "Debate Opponent": """You are a skilled debate opponent in a lively, thought-provoking discussion. 
+    If it’s the first turn, propose one interesting debate topic (e.g., 'Should social media be regulated?') and ask the user to pick a stance. 
+    Then, challenge their argument naturally with facts and reasoning, keeping the tone respectful yet engaging. 
+    Respond to their latest point in a smooth back-and-forth style, asking a thought-provoking question if they struggle. 
+    If they request it, switch sides and argue the opposite perspective. 
+    Avoid long monologues; keep it concise and dynamic.""",
+
+    "Casual Friend": """You are a friendly, casual conversational partner chatting like a close friend. 
+    Pick a fun, everyday topic (e.g., movies, travel, food, hobbies) or build on what they say, asking natural follow-ups to keep it flowing. 
+    Use a playful, relaxed tone with light humor. 
+    If their response sounds excited, match it with enthusiasm (e.g., 'No way, that’s awesome!'). 
+    If it hints at feeling down, offer supportive words (e.g., 'That sounds tough—want to talk about it?'). 
+    Keep it short, effortless, and enjoyable.""",
+
+    "custom":"""You are an AI communication assistant. Respond naturally based on the conversation context."""
+}
+
+
+# Function to fold older chat turns into the running summary used by build_context; raises on API errors
+def summarize_chat(summary, messages, priority=INTERACTIVE):
+    transcript = "\n".join(f"{'User' if msg['role'] == 'user' else 'AI'}: {msg['content']}" for msg in messages)
+    response = create_completion(priority, "summary",
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": (
+                "You maintain a running summary of a communication practice chat. "
+                "Merge the new turns into the current summary. Keep the topic, the questions asked, the user's main points "
+                "and notable language mistakes, and anything the AI said it would come back to. Max 150 words."
+            )},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+        ],
+        max_tokens=300
+    )
+    return response.choices[0].message.content.strip()
+
+
+# Function to build the request for a chat turn: bounded by CHAT_CONTEXT_TOKENS, older turns summarized into `memory`
+# at the caller's priority
+def chat_context(system_prompt, chat_history, memory=None, priority=INTERACTIVE):
+    if memory is None:
+        memory = new_memory()
+    return build_context(system_prompt, chat_history, memory, CHAT_CONTEXT_TOKENS,
+                         lambda summary, messages: summarize_chat(summary, messages, priority))
+
+
+def daily_practice_chat_response(role, chat_history, memory=None):
+    try:
+        messages = chat_context(role_prompts[role], chat_history, memory)
+        response = create_completion(INTERACTIVE, "chat",
+            model="gpt-3.5-turbo",
+            messages=messages
+        )
+        ai_response = response.choices[0].message.content.strip()
+        ai_audio = text_to_speech(ai_response)
+        return ai_response, ai_audio
+
+    except Exception as e:
+        logging.error(f"Error generating chat reply: {e}")
+        return error_message(e), None
+
+
+# Sentence boundary used to hand finished sentences to TTS while the reply is still streaming
+sentence_end = re.compile(r"(?<=[.!?])\s+")
+
+# Function to stream the AI reply token by token; each finished sentence is synthesized in the background.
+# `reply` collects the pending speech futures and any error message for collect_speech().
+def daily_practice_chat_stream(role, chat_history, reply, memory=None):
+    reply["speech"] = []
+    reply["error"] = None
+    started = False
+    pending = ""
+    try:
+        messages = chat_context(role_prompts[role], chat_history, memory)
+        # Retries only cover opening the stream; a reply that fails midway is reported, not replayed
+        stream = create_completion(INTERACTIVE, "chat",
+            model="gpt-3.5-turbo",
+            messages=messages,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
                 continue
-            return "Request timed out after retries. Check your connection and retry.", None
-        except APIError as e:
-            if "503" in str(e) and attempt < max_retries - 1:  
-                time.sleep(2 ** attempt)
+            token = chunk.choices[0].delta.content
+            if not token:
                 continue
-            return f"Server issue: {str(e)}. Please try again later.", None
-        except AuthenticationError:
-            return "Authentication error: Please check your API key and try again.", None
+            if not started:
+                token = token.lstrip()
+                started = bool(token)
+            pending += token
+            *sentences, pending = sentence_end.split(pending)
+            for sentence in sentences:
+                reply["speech"].append(executor.submit(text_to_speech, sentence))
+            yield token
+        if pending.strip():
+            reply["speech"].append(executor.submit(text_to_speech, pending.strip()))
+
+    except Exception as e:
+        logging.error(f"Error streaming chat reply: {e}")
+        reply["error"] = error_message(e)
+
+
+# Function to join the per-sentence speech of a streamed reply into one MP3; None if nothing was synthesized
+def collect_speech(reply):
+    audio_file = io.BytesIO()
+    for future in reply.get("speech", []):
+        try:
+            audio_file.write(future.result().getvalue())
         except Exception as e:
-            return f"An unexpected error occurred: {str(e)}. Please try again or contact support.", None
+            logging.error(f"Error synthesizing reply sentence: {e}")
+    if audio_file.tell() == 0:
+        return None
+    audio_file.seek(0)
+    return audio_file
 
 
 # Feedback generation function daily practice
-def generate_feedback_daily_practice(chat_history):
+def generate_feedback_daily_practice(chat_history, user_id=None):
+    user_id = user_id or current_user_id()
+    feedback, scores, metrics = evaluate_daily_practice(chat_history)
+    record_scores("Daily Practice", scores, user_id, metrics)
+    return feedback
+
+
+# Function to evaluate a chat session without touching Streamlit state; returns (feedback, scores, metrics)
+def evaluate_daily_practice(chat_history, priority=INTERACTIVE):
     prompt = (
         "You are a communication trainer evaluating a student's chat session. "
         "Analyze their responses carefully and provide a structured, insightful evaluation. "
@@ -139,145 +436,169 @@ def generate_feedback_daily_practice(chat_history):
         "Return your evaluation as a structured report with clear scores out of 10 for each category, "
         "along with specific suggestions for improvement."
     )
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            feedback_response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": prompt}] + 
-                         [{"role": msg["role"], "content": msg["content"]} for msg in chat_history],
-                timeout=10 
-            )
-            feedback = feedback_response.choices[0].message.content.strip()
-
-            try:
-                scores = generate_progress_scores(client, "Daily Practice", None, chat_history)
-                date = datetime.now().strftime("%Y-%m-%d")
-                save_progress_csv(date, "Daily Practice", scores)
-            except (RateLimitError, requests.Timeout, APIError, Exception):
-                pass 
-            return feedback
-
-        except RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  
-                continue
-            return "Rate limit exceeded after retries. Please try again later."
-        except requests.Timeout:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            return "Request timed out after retries. Check your connection and retry."
-        except APIError as e:
-            if "503" in str(e) and attempt < max_retries - 1: 
-                time.sleep(2 ** attempt)
-                continue
-            return f"Server issue: {str(e)}. Please try again later."
-        except AuthenticationError:
-            return "Authentication error: Please check your API key."
-        except Exception as e:
-            return f"An unexpected error occurred: {str(e)}. Please try again or contact support."
+    metrics = chat_metrics(chat_history)
+    system_prompt = prompt + evaluation_format + metrics_guidance + f"\nMeasured metrics:\n{format_metrics(metrics)}"
+    # A fresh memory: summarizing here must not change the rolling summary the live chat relies on
+    messages = chat_context(system_prompt, chat_history, new_memory(), priority)
+    feedback, scores = _request_feedback_daily_practice(messages, priority)
+    return feedback, scores, metrics
+
+
+def _request_feedback_daily_practice(messages, priority=INTERACTIVE):
+    try:
+        feedback_response = create_completion(priority, "evaluation",
+            model="gpt-3.5-turbo",
+            messages=messages,
+            response_format={"type": "json_object"}
+        )
+        return parse_evaluation(feedback_response.choices[0].message.content)
+
+    except Exception as e:
+        logging.error(f"Error requesting daily practice feedback: {e}")
+        return error_message(e), None
 
 
-# Feedback generation function
-def generate_feedback_presentation(response,task, is_voice=False):
+# Feedback generation function. For a recording, `speech_metrics` from record_and_convert gives the
+# evaluator measured pacing and prosody instead of leaving it to guess delivery from the transcript.
+def generate_feedback_presentation(response,task, is_voice=False, user_id=None, speech_metrics=None):
+    user_id = user_id or current_user_id()
+    feedback, scores, metrics = evaluate_presentation(response, task, is_voice, speech_metrics)
+    record_scores("Presentation", scores, user_id, metrics)
+    return feedback
+
+
+# Function to evaluate a presentation without touching Streamlit state; returns (feedback, scores, metrics)
+def evaluate_presentation(response, task, is_voice=False, speech_metrics=None, priority=INTERACTIVE):
+    if is_voice and speech_metrics:
+        delivery = (
+            "2. Delivery: The presentation was spoken; the text is a transcript. Judge pacing, pauses, fluency and vocal "
+            "variety from the measured speech metrics provided (typical conversational pace is 120-160 words per minute; "
+            "pitch variation under about 2 semitones sounds monotone), and cite the numbers in your feedback. "
+        )
+    elif is_voice:
+        delivery = "2. Delivery: The presentation was spoken; infer pacing, tone and clarity from the transcript. "
+    else:
+        delivery = "2. Delivery: The presentation was written; assess flow, tone and clarity of the text. "
     prompt = (
         "You are a communication trainer evaluating a student's presentation. "
         "Provide genuine, candid feedback based on: "
         "1. Structure: Is there a clear intro, body, and conclusion? "
-        "2. Delivery: Assess pacing, tone, and clarity (for voice, infer from transcribed text). "
+        + delivery +
         "3. Content: Evaluate persuasiveness, vocabulary, and relevance. "
         "Do not be neutral—highlight strengths and weaknesses. "
         "Return a structured report with scores out of 10 for each category and specific suggestions for improvement."
     )
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            feedback_response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Task: {task}\nResponse: {response}"}
-                ],
-                timeout=10
-            )
-            feedback = feedback_response.choices[0].message.content.strip()
-            try:
-                scores = generate_progress_scores(client, "Presentation", response)
-                date = datetime.now().strftime("%Y-%m-%d")
-                save_progress_csv(date, "Presentation", scores)
-            except (RateLimitError, requests.Timeout, APIError, Exception):
-                pass
-            return feedback
-
-        except RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  
-                continue
-            return "Rate limit exceeded after retries. Please try again later."
-        except AuthenticationError:
-            return "Authentication error: Please check your API key."
-        except requests.Timeout:
-            return "Request timed out. Check your connection and retry."
-        except APIError as e:
-            return f"Server issue: {str(e)}. Try again later."
-        except Exception as e:
-            return f"Unexpected error: {str(e)}. Contact support."
-        
+    metrics = {**text_metrics(response), **(speech_metrics if is_voice and speech_metrics else {})}
+    feedback, scores = _request_feedback_presentation(prompt + evaluation_format + metrics_guidance, response, task,
+                                                      metrics, priority)
+    return feedback, scores, metrics
 
-# Function to generate prompts using LLM
-def generate_prompt_skilltraining(activity):
-    base_prompt = (
-        "You are a communication trainer providing students with engaging prompts to develop their communication, "
-        "creativity, and language skills. The prompts should be thought-provoking and push users to express themselves clearly."
-    )
-    prompts = {
-        "Impromptu Speaking": (
-            base_prompt + " Generate a compelling and thought-provoking topic (max 15 words) for an impromptu speech. "
-            "The topic should be broad enough for different perspectives and encourage spontaneous thinking. "
-            "Examples: 'Should AI have rights like humans?' or 'The impact of space exploration on daily life.'"
-        ),
-        
-        "Storytelling": (
-            base_prompt + " Provide a vivid, **imaginary** scenario (under 20 words) for a short personal story. "
-            "Begin with 'Imagine you are in this situation...' so the user can describe it freely. "
-            "The scenario should be unique and allow for emotional depth. "
-            "Examples: 'Imagine you wake up with the ability to understand all languages,' or "
-            "'Imagine you find a mysterious letter in an old bookstore that changes your life.'"
-        ),
-        "Conflict Resolution": (
-            base_prompt + " Create a **fictional** workplace conflict scenario (15-20 words) that requires negotiation and problem-solving. "
-            "Start with 'Imagine you are in this situation...' so the user can think critically without personal experience. "
-            "The conflict should be realistic yet challenging. "
-            "Examples: 'Imagine your manager unfairly blames you for missing a deadline,' or "
-            "'Imagine you discover a colleague has been spreading false rumors about you at work.'"
-        )
-    }
+
+def _request_feedback_presentation(prompt, response, task, metrics=None, priority=INTERACTIVE):
+    content = f"Task: {task}\nResponse: {response}"
+    if metrics:
+        content += f"\nMeasured metrics:\n{format_metrics(metrics)}"
     try:
-        response = client.chat.completions.create(
+        feedback_response = create_completion(priority, "evaluation",
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are a communication trainer."},
-                {"role": "user", "content": prompts[activity]}
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": content}
             ],
-            timeout=10 
+            response_format={"type": "json_object"}
         )
-        return response.choices[0].message.content.strip()
+        return parse_evaluation(feedback_response.choices[0].message.content)
+
+    except Exception as e:
+        logging.error(f"Error requesting presentation feedback: {e}")
+        return error_message(e), None
+
+
+# Instructions used to generate a prompt for each skill-training activity
+base_prompt = (
+    "You are a communication trainer providing students with engaging prompts to develop their communication, "
+    "creativity, and language skills. The prompts should be thought-provoking and push users to express themselves clearly."
+)
+skilltraining_prompts = {
+    "Impromptu Speaking": (
+        base_prompt + " Generate a compelling and thought-provoking topic (max 15 words) for an impromptu speech. "
+        "The topic should be broad enough for different perspectives and encourage spontaneous thinking. "
+        "Examples: 'Should AI have rights like humans?' or 'The impact of space exploration on daily life.'"
+    ),
     
-    except RateLimitError:
-        return "Oops! We've hit the API rate limit. Please wait a moment and try again."
-    except AuthenticationError:
-        return "Authentication error: Please check your API key and try again."
-    except requests.Timeout:
-        return "The request timed out. Check your internet connection and try again."
-    except APIError as e:
-        return f"Server issue: {str(e)}. Please try again later."
+    "Storytelling": (
+        base_prompt + " Provide a vivid, **imaginary** scenario (under 20 words) for a short personal story. "
+        "Begin with 'Imagine you are in this situation...' so the user can describe it freely. "
+        "The scenario should be unique and allow for emotional depth. "
+        "Examples: 'Imagine you wake up with the ability to understand all languages,' or "
+        "'Imagine you find a mysterious letter in an old bookstore that changes your life.'"
+    ),
+    "Conflict Resolution": (
+        base_prompt + " Create a **fictional** workplace conflict scenario (15-20 words) that requires negotiation and problem-solving. "
+        "Start with 'Imagine you are in this situation...' so the user can think critically without personal experience. "
+        "The conflict should be realistic yet challenging. "
+        "Examples: 'Imagine your manager unfairly blames you for missing a deadline,' or "
+        "'Imagine you discover a colleague has been spreading false rumors about you at work.'"
+    )
+}
+
+
+# Function to request a new prompt from the LLM; raises on API errors. Pool refills run at BACKGROUND priority.
+def request_prompt_skilltraining(activity, priority=BACKGROUND):
+    response = create_completion(priority, "prompt",
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You are a communication trainer."},
+            {"role": "user", "content": skilltraining_prompts[activity]}
+        ]
+    )
+    return response.choices[0].message.content.strip()
+
+
+# Function to generate a prompt while the user waits; returns (prompt, None), or (None, error message) on failure
+def generate_prompt_skilltraining(activity):
+    try:
+        return request_prompt_skilltraining(activity, INTERACTIVE), None
+
+    except Exception as e:
+        logging.error(f"Error generating prompt for {activity}: {e}")
+        return None, error_message(e)
+
+
+# Prefetched prompts per activity, shared by all sessions and persisted across restarts
+prompt_pool = PromptPool(request_prompt_skilltraining, skilltraining_prompts, os.path.join(DATA_DIR, "prompt_pool.json"))
+
+
+# Function to serve the next prompt: an instant pop from the pool, generating inline only when it is empty.
+# Returns (prompt, None), or (None, error message) when the inline request fails.
+def next_prompt_skilltraining(activity):
+    prompt = prompt_pool.pop(activity)
+    if prompt is not None:
+        return prompt, None
+    prompt, error = generate_prompt_skilltraining(activity)
+    if prompt is not None:
+        prompt_pool.mark_served(activity, prompt)
+    return prompt, error
+
+
+# Feedback generation function. `task` is the prompt the user answered; it defaults to the one on screen.
+def generate_feedback_skilltraining(response, activity, is_voice=False, user_id=None, task=None):
+    # Session state is only touched from the script thread; workers get plain values
+    task = task or st.session_state.current_prompt
+    user_id = user_id or current_user_id()
+    prompt_future = executor.submit(next_prompt_skilltraining, activity)
+    feedback, scores, metrics = evaluate_skilltraining(response, activity, task)
+    record_scores(activity, scores, user_id, metrics)
+    try:
+        st.session_state.current_prompt, st.session_state.prompt_error = prompt_future.result()
     except Exception as e:
-        return f"An unexpected error occurred: {str(e)}. Please try again or contact support."
+        logging.error(f"Error generating next prompt for {activity}: {e}")
+    return feedback
 
 
-# Feedback generation function
-def generate_feedback_skilltraining(response, activity, is_voice=False):
+# Function to evaluate a skill-training response to `task` without touching Streamlit state;
+# returns (feedback, scores, metrics)
+def evaluate_skilltraining(response, activity, task, priority=INTERACTIVE):
     prompt = (
         f"You are a communication trainer evaluating a student's {activity.lower()} response. "
         "Your feedback should be **constructive and insightful**, helping the student improve. "
@@ -294,87 +615,42 @@ def generate_feedback_skilltraining(response, activity, is_voice=False):
         "Provide **actionable suggestions** for improvement. Assign scores out of 10 for each category.\n"
         "Keep feedback concise yet meaningful."
     )
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            feedback_response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Prompt/Scenario: {st.session_state.current_prompt}\nResponse: {response}"}
-                ],
-                timeout=10 
-            )
-            feedback = feedback_response.choices[0].message.content.strip()
-
-            try:
-                scores = generate_progress_scores(client, activity, response)
-                date = datetime.now().strftime("%Y-%m-%d")
-                save_progress_csv(date, activity, scores)
-            except (RateLimitError, requests.Timeout, APIError, Exception):
-                pass  
-            try:
-                st.session_state.current_prompt = generate_prompt_skilltraining(activity)
-            except (RateLimitError, requests.Timeout, APIError, Exception):
-                pass  
-            return feedback
-
-        except RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt) 
-                continue
-            return "Rate limit exceeded after retries. Please try again later."
-        except AuthenticationError:
-            return "Authentication error: Please check your API key."
-        except requests.Timeout:
-            return "Request timed out. Check your connection and retry."
-        except APIError as e:
-            return f"Server issue: {str(e)}. Please try again later."
-        except Exception as e:
-            return f"Unexpected error: {str(e)}. Contact support."
-        
+    metrics = text_metrics(response)
+    feedback, scores = _request_feedback_skilltraining(prompt + evaluation_format + metrics_guidance, response,
+                                                       task, metrics, priority)
+    return feedback, scores, metrics
 
-def generate_progress_scores(client, activity, response, chat_history=None):
-    prompt = (
-        "You are a communication trainer. Evaluate this response or chat session and return only scores out of 10 for: "
-        "Content, Delivery, Structure, Language skills, Creativity, Communication, Vocabulary, Grammar. "
-        "Format exactly as 'Content: X/10, Delivery: Y/10, Structure: Z/10, Language skills: W/10, Creativity: V/10, "
-        "Communication: U/10, Vocabulary: T/10, Grammar: S/10'. Use 0 for criteria not applicable to the activity."
-    )
-    messages = [{"role": "system", "content": prompt}]
-    if chat_history:
-        messages.extend([{"role": msg["role"], "content": msg["content"]} for msg in chat_history])
-    else:
-        messages.append({"role": "user", "content": response})
-    
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    ).choices[0].message.content
-    
-    logging.debug(f"Raw LLM score response for {activity}: {response}")
-    
+
+def _request_feedback_skilltraining(prompt, response, current_prompt, metrics=None, priority=INTERACTIVE):
+    content = f"Prompt/Scenario: {current_prompt}\nResponse: {response}"
+    if metrics:
+        content += f"\nMeasured metrics:\n{format_metrics(metrics)}"
     try:
-        scores = dict(item.split(": ") for item in response.split(", "))
-        scores = {k.lower(): int(v.split("/")[0]) for k, v in scores.items()}
-    except (ValueError, AttributeError) as e:
-        logging.error(f"Error parsing scores: {e}. Raw response: {response}")
-        scores = {"content": 0, "delivery": 0, "structure": 0, "language skills": 0, 
-                  "creativity": 0, "communication": 0, "vocabulary": 0, "grammar": 0}
-    
-    logging.debug(f"Parsed scores for {activity}: {scores}")
-    return scores
+        feedback_response = create_completion(priority, "evaluation",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": content}
+            ],
+            response_format={"type": "json_object"}
+        )
+        return parse_evaluation(feedback_response.choices[0].message.content)
+
+    except Exception as e:
+        logging.error(f"Error requesting skill training feedback: {e}")
+        return error_message(e), None
 
 
-def generate_tips_from_trend(df):
-    if df.empty:
+# daily_scores: per-day criterion means from load_daily_scores(); recent: latest rows from load_recent_scores()
+def generate_tips_from_trend(daily_scores, recent):
+    if daily_scores.empty:
         return "No progress data available yet. Start practicing to get tips!"
     # Calculate average daily scores
     criteria_cols = ['Content', 'Delivery', 'Structure', 'Language skills', 'Creativity', 'Communication', 'Vocabulary', 'Grammar']
-    daily_avg = df.groupby('date')[criteria_cols].mean().mean(axis=1)
+    daily_avg = daily_scores[criteria_cols].mean(axis=1)
     # Analyze trend
     trend = daily_avg.diff().mean()  
-    latest_scores = df.tail(5)[criteria_cols].mean()  
+    latest_scores = recent[criteria_cols].mean()  
     
     prompt = f"""
     Based on the following progress trend from a communication training app:
@@ -401,26 +677,13 @@ def generate_tips_from_trend(df):
       - Playing word-based games (Scrabble, crosswords, etc.)  
       - Listening to podcasts or audiobooks in the target language  
         """
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                timeout=10
-            )
-            return response.choices[0].message.content.strip()
-        
-        except RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # 1s, 2s, 4s
-                continue
-            return "Oops! We've hit the API rate limit. Please wait a moment and try again."
-        except AuthenticationError:
-            return "Authentication error: Please check your API key."
-        except requests.Timeout:
-            return "Request timed out. Check your connection and retry."
-        except APIError as e:
-            return f"Server issue: {str(e)}. Try again later."
-        except Exception as e:
-            return f"Unexpected error: {str(e)}. Contact support."
\ No newline at end of file
+    try:
+        response = create_completion(BACKGROUND, "tips", cache=True,
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.choices[0].message.content.strip()
+
+    except Exception as e:
+        logging.error(f"Error generating tips: {e}")
+        return error_message(e)
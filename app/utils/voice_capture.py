@@ -0,0 +1,155 @@
+from utils.speech_to_text import NotUnderstood
+
+
+# Function to compute the RMS energy of a block of PCM, on the same scale as SpeechRecognition's energy_threshold
+def frame_rms(pcm, sample_width=2):
+    import numpy as np
+
+    samples = np.frombuffer(pcm, dtype=np.int16 if sample_width == 2 else np.int8).astype(np.float32)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+# Energy-based voice activity detector. Audio is fed in arbitrary chunks, cut into fixed frames,
+# and returned as speech segments each time the speaker pauses for `silence_ms`, so every
+# segment can be transcribed while recording goes on. Segments are padded with a little
+# audio on both sides so word edges aren't clipped.
+class Segmenter:
+    def __init__(self, sample_rate, sample_width=2, energy_threshold=300, frame_ms=30, silence_ms=600,
+                 min_speech_ms=200, padding_ms=150, max_segment_seconds=15):
+        self.sample_width = sample_width
+        self.energy_threshold = energy_threshold
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * sample_width
+        self.frame_seconds = frame_ms / 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.padding_frames = max(1, padding_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_seconds * 1000 // frame_ms)
+        self.buffer = b""
+        self.lead_in = []
+        self.segment = []
+        self.speech_frames = 0
+        self.quiet_frames = 0
+        self.heard_speech = False
+        self.trailing_silence = 0.0
+        self.elapsed = 0.0
+
+    def _is_speech(self, frame):
+        return frame_rms(frame, self.sample_width) > self.energy_threshold
+
+    # Returns the list of segments (raw PCM bytes) completed by this chunk
+    def feed(self, pcm):
+        self.buffer += pcm
+        segments = []
+        while len(self.buffer) >= self.frame_bytes:
+            frame, self.buffer = self.buffer[:self.frame_bytes], self.buffer[self.frame_bytes:]
+            speech = self._is_speech(frame)
+            self.elapsed += self.frame_seconds
+            if speech:
+                self.heard_speech = True
+                self.trailing_silence = 0.0
+            else:
+                self.trailing_silence += self.frame_seconds
+
+            if not self.segment:
+                if speech:
+                    self.segment = self.lead_in + [frame]
+                    self.speech_frames = 1
+                    self.quiet_frames = 0
+                    self.lead_in = []
+                else:
+                    self.lead_in = (self.lead_in + [frame])[-self.padding_frames:]
+                continue
+
+            self.segment.append(frame)
+            if speech:
+                self.speech_frames += 1
+                self.quiet_frames = 0
+            else:
+                self.quiet_frames += 1
+            if self.quiet_frames >= self.silence_frames or len(self.segment) >= self.max_segment_frames:
+                segment = self._close()
+                if segment:
+                    segments.append(segment)
+        return segments
+
+    # Returns whatever is still being collected as a final segment
+    def flush(self):
+        segment = self._close() if self.segment else None
+        return [segment] if segment else []
+
+    def _close(self):
+        # Keep `padding_frames` of the trailing pause and drop the rest
+        keep = len(self.segment) - max(0, self.quiet_frames - self.padding_frames)
+        frames, speech_frames = self.segment[:keep], self.speech_frames
+        self.segment = []
+        self.speech_frames = 0
+        self.quiet_frames = 0
+        # A click or a cough is shorter than min_speech and isn't worth a transcription call
+        if speech_frames < self.min_speech_frames:
+            return None
+        return b"".join(frames)
+
+
+# Ordered transcripts of the segments of one recording. `submit(segment)` returns a future for the
+# segment's text; partial() joins the finished prefix for live display, result() waits for the rest.
+class StreamingTranscript:
+    def __init__(self, submit):
+        self.submit = submit
+        self.futures = []
+
+    def add(self, segment):
+        self.futures.append(self.submit(segment))
+
+    def partial(self):
+        texts = []
+        for future in self.futures:
+            if not future.done():
+                break
+            if future.exception() is None:
+                texts.append(future.result())
+        return " ".join(texts)
+
+    # Raises NotUnderstood when no segment produced words; engine errors are raised as they are
+    def result(self):
+        texts = []
+        for future in self.futures:
+            try:
+                texts.append(future.result())
+            except NotUnderstood:
+                continue
+        if not texts:
+            raise NotUnderstood()
+        return " ".join(texts)
+
+
+# Function to record from `read_chunk()` until the speaker stops, handing each voice segment to
+# `transcript` as soon as it ends. `on_partial(text)` is called whenever more of the transcript is ready.
+# Stops after `end_silence` seconds of silence following speech, after `timeout` seconds without any
+# speech, or at `phrase_time_limit`, all measured in audio time. Returns all recorded PCM.
+def capture(read_chunk, segmenter, transcript, on_partial=None, timeout=5, phrase_time_limit=120, end_silence=1.5):
+    recorded = []
+    shown = ""
+    while True:
+        pcm = read_chunk()
+        if not pcm:
+            break
+        recorded.append(pcm)
+        for segment in segmenter.feed(pcm):
+            transcript.add(segment)
+        if on_partial is not None:
+            text = transcript.partial()
+            if text != shown:
+                shown = text
+                on_partial(text)
+        elapsed = segmenter.elapsed
+        if not segmenter.heard_speech and elapsed >= timeout:
+            break
+        if segmenter.heard_speech and segmenter.trailing_silence >= end_silence:
+            break
+        if elapsed >= phrase_time_limit:
+            break
+    for segment in segmenter.flush():
+        transcript.add(segment)
+    return b"".join(recorded)
@@ -0,0 +1,343 @@
+# Interaction benchmark: latency, API calls and tokens per user interaction, measured against the
+# local mock OpenAI server (mock_openai.py) with speech synthesis replaced by a fixed-latency stand-in.
+#
+#   python benchmarks/interactions.py                                 # table
+#   python benchmarks/interactions.py --json > before.json            # machine-readable
+#   python benchmarks/interactions.py --baseline before.json          # compare with an earlier run
+#   python benchmarks/interactions.py --baseline before.json --max-regression 20   # exit 1 on regressions
+#   python benchmarks/interactions.py --latency-ms 800 --rate-limit-rate 0.1 --only page:
+#
+# "utils:" flows call the functions in utils.py directly; "page:" flows drive the page functions through
+# Streamlit's AppTest, reruns included. Calls and tokens are what the mock received from the start of an
+# interaction until it goes quiet, so background work it sets off (prompt pool refills, chat summaries)
+# counts towards it; calls include retried requests.
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_openai import MockOpenAI, mock_tts
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+BENCH_USER = "bench"
+PAGE_SCRIPT = "from {module} import {function}\n{function}()\n"
+TASK = "Pitch a product or service idea to a potential investor in 2 minutes."
+RESPONSE = (
+    "Good morning everyone. Today I want to introduce a simple app that helps small teams plan meetings. "
+    "Most of us lose an hour every week to scheduling, and that time adds up. Our app reads everyone's "
+    "calendar, suggests a slot, and books the room. We have fifty pilot users and they love it. "
+    "With your investment we will grow the team and reach a thousand companies next year. Thank you."
+)
+USER_TURNS = [
+    "Hi, I'm ready for the interview.",
+    "I studied computer science and worked two years as a backend developer.",
+    "My biggest strength is staying calm when production breaks, I think it comes from on-call work.",
+    "I once had to tell a client their launch would slip, so I explained why and offered a plan B.",
+    "In five years I would like to lead a small team and still write code every day.",
+]
+SPEECH_METRICS = {"duration_seconds": 64.0, "words": 120, "speaking_seconds": 58.2, "words_per_minute": 123.7,
+                  "pauses": 9, "mean_pause_seconds": 0.62, "longest_pause_seconds": 1.4, "pause_ratio": 0.1,
+                  "fillers": 4, "fillers_per_100_words": 3.3, "energy_variation_db": 6.1,
+                  "pitch_mean_hz": 182.0, "pitch_variation_semitones": 2.4}
+
+
+# Function to build a chat history of `turns` user messages with AI replies in between
+def chat_history(turns):
+    history = []
+    for index in range(turns):
+        history.append({"role": "user", "content": USER_TURNS[index % len(USER_TURNS)], "type": "text"})
+        history.append({"role": "assistant", "content": "That's interesting, tell me more about how you handled it "
+                                                        "and what you would do differently next time.", "type": "text"})
+    return history
+
+
+# Function to start the mock backend and import the app against it; returns (mock, utils module).
+# Everything the app reads from the environment has to be set before utils is first imported.
+def setup_app(args):
+    mock = MockOpenAI(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, token_ms=args.token_ms,
+                      error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed).start()
+    # Keep the benchmark away from real data: an empty data dir and no legacy CSV import
+    data_dir = tempfile.mkdtemp(prefix="fluentflow-bench-")
+    os.environ.update(OPENAI_BASE_URL=mock.url, OPENAI_API_KEY1="mock", FLUENTFLOW_DATA_DIR=data_dir,
+                      LEGACY_PROGRESS_CSV=os.path.join(data_dir, "none.csv"), STT_ENGINE="google",
+                      STREAMLIT_LOGGER_LEVEL="error")
+    sys.path.insert(0, APP_DIR)
+    import utils.utils as utils
+
+    # utils turns on debug logging for the app; per-call logs would drown the results
+    logging.getLogger().setLevel(logging.ERROR)
+    utils.synthesize_speech = mock_tts(args.tts_ms)
+    if args.rpm:
+        utils.scheduler.requests_per_minute = args.rpm
+    if args.tpm:
+        utils.scheduler.tokens_per_minute = args.tpm
+    return mock, utils
+
+
+# Function to give a user a few days of progress so the Progress page has trends to work with.
+# Each `variant` has different recent scores, so its tips request isn't answered from the response cache.
+def seed_progress(utils, user, days=5, variant=0):
+    scores = {"content": 6, "delivery": 5, "structure": 7, "language skills": 6,
+              "creativity": variant % 11, "communication": 7, "vocabulary": variant // 11 % 11, "grammar": 7}
+    rows = [utils.progress_row(f"2024-01-{day + 1:02d}", module, scores, user)
+            for day in range(days) for module in ("Presentation", "Daily Practice")]
+    utils.progress_store.insert_rows(rows)
+
+
+# Function to build an AppTest that runs one page function as a session of `user`
+def page_test(module, function, user=BENCH_USER, timeout=60):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(PAGE_SCRIPT.format(module=module, function=function), default_timeout=timeout)
+    at.query_params["user"] = user
+    return at
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+# A page interaction succeeded when the script didn't raise and showed no st.error
+def page_ok(at):
+    return not at.exception and not at.error
+
+
+# Each flow prepares one interaction and returns the callable that performs it (the timed part),
+# which returns whether it succeeded
+def flows(utils, user=BENCH_USER, timeout=60):
+    def chat_turn(i):
+        history = chat_history(3)
+        return lambda: utils.daily_practice_chat_response("Job Interviewer", history, utils.new_memory())[1] is not None
+
+    def chat_turn_stream(i):
+        history = chat_history(3)
+
+        def act():
+            reply = {}
+            "".join(utils.daily_practice_chat_stream("Job Interviewer", history, reply, utils.new_memory()))
+            return reply["error"] is None and utils.collect_speech(reply) is not None
+        return act
+
+    def chat_turn_long_history(i):
+        # Past the context budget with an empty memory: the turn also pays for summarizing older turns
+        history = chat_history(40)
+        return lambda: utils.daily_practice_chat_response("Casual Friend", history, utils.new_memory())[1] is not None
+
+    def daily_practice_feedback(i):
+        history = chat_history(5)
+        return lambda: bool(utils.generate_feedback_daily_practice(history, user_id=user))
+
+    def presentation_feedback(i):
+        return lambda: utils.evaluate_presentation(RESPONSE, TASK)[1] is not None
+
+    def presentation_feedback_voice(i):
+        return lambda: utils.evaluate_presentation(RESPONSE, TASK, True, SPEECH_METRICS)[1] is not None
+
+    def skill_prompt(i):
+        return lambda: utils.next_prompt_skilltraining("Storytelling")[0] is not None
+
+    def skill_feedback(i):
+        return lambda: utils.evaluate_skilltraining(RESPONSE, "Impromptu Speaking", TASK)[1] is not None
+
+    def progress_tips(i):
+        tips_user = f"{user}-tips-{i}"
+        seed_progress(utils, tips_user, variant=i)
+        return lambda: not utils.generate_tips_from_trend(utils.load_daily_scores(tips_user),
+                                                          utils.load_recent_scores(tips_user)).startswith("Oops")
+
+    def page_daily_practice_turn(i):
+        at = page_test("modules.daily_practice", "display_daily_practice", user, timeout)
+        at.run()
+        at.text_input(key="text_input").input(USER_TURNS[i % len(USER_TURNS)])
+        button(at, "Send").click()
+        return lambda: page_ok(at.run())
+
+    def page_daily_practice_end_chat(i):
+        at = page_test("modules.daily_practice", "display_daily_practice", user, timeout)
+        at.session_state["chat_history"] = chat_history(5)
+        at.run()
+        button(at, "End Chat").click()
+        return lambda: page_ok(at.run())
+
+    def page_skill_training_open(i):
+        at = page_test("modules.skill_training", "display_skill_training", user, timeout)
+        return lambda: page_ok(at.run())
+
+    def page_skill_training_submit(i):
+        at = page_test("modules.skill_training", "display_skill_training", user, timeout)
+        at.run()
+        at.chat_input[0].set_value(RESPONSE)
+        return lambda: page_ok(at.run())
+
+    def page_presentation_submit(i):
+        at = page_test("modules.presentation", "display_presentation", user, timeout)
+        at.run()
+        at.chat_input[0].set_value(RESPONSE)
+        return lambda: page_ok(at.run())
+
+    def page_progress_open(i):
+        at = page_test("modules.progress", "display_progress", user, timeout)
+        return lambda: page_ok(at.run())
+
+    def page_progress_generate(i):
+        # A learner of their own, so this is a first click rather than a response cache hit
+        generate_user = f"{user}-generate-{i}"
+        seed_progress(utils, generate_user, variant=1000 + i)
+        at = page_test("modules.progress", "display_progress", generate_user, timeout)
+        at.run()
+        button(at, "Generate").click()
+        return lambda: page_ok(at.run())
+
+    return {
+        "utils:chat_turn": chat_turn,
+        "utils:chat_turn_stream": chat_turn_stream,
+        "utils:chat_turn_long_history": chat_turn_long_history,
+        "utils:daily_practice_feedback": daily_practice_feedback,
+        "utils:presentation_feedback": presentation_feedback,
+        "utils:presentation_feedback_voice": presentation_feedback_voice,
+        "utils:skill_prompt": skill_prompt,
+        "utils:skill_feedback": skill_feedback,
+        "utils:progress_tips": progress_tips,
+        "page:daily_practice_turn": page_daily_practice_turn,
+        "page:daily_practice_end_chat": page_daily_practice_end_chat,
+        "page:skill_training_open": page_skill_training_open,
+        "page:skill_training_submit": page_skill_training_submit,
+        "page:presentation_submit": page_presentation_submit,
+        "page:progress_open": page_progress_open,
+        "page:progress_generate": page_progress_generate,
+    }
+
+
+# Linear-interpolated percentile of a non-empty list
+def percentile(samples, q):
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def latency_summary(samples_ms):
+    return {"p50_ms": round(percentile(samples_ms, 50), 1), "p95_ms": round(percentile(samples_ms, 95), 1),
+            "p99_ms": round(percentile(samples_ms, 99), 1), "mean_ms": round(sum(samples_ms) / len(samples_ms), 1),
+            "max_ms": round(max(samples_ms), 1)}
+
+
+def measure(flow, mock, iterations, warmup):
+    samples, calls, tokens, failures = [], [], [], 0
+    for i in range(warmup + iterations):
+        act = flow(i)
+        mock.wait_idle()
+        before = mock.stats()
+        started = time.perf_counter()
+        try:
+            ok = act()
+        except Exception as e:
+            logging.error(f"Interaction raised: {e!r}")
+            ok = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        mock.wait_idle()
+        after = mock.stats()
+        if i < warmup:
+            continue
+        samples.append(elapsed_ms)
+        calls.append(after["requests"] - before["requests"])
+        tokens.append(after["prompt_tokens"] + after["completion_tokens"] - before["prompt_tokens"] - before["completion_tokens"])
+        failures += 0 if ok else 1
+    return {"runs": iterations, "failures": failures, **latency_summary(samples),
+            "calls_per_interaction": round(sum(calls) / len(calls), 2),
+            "tokens_per_interaction": round(sum(tokens) / len(tokens), 1)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to compare two runs; returns the lines to print and the regressions beyond `max_regression` percent
+def compare(results, baseline, max_regression):
+    lines, regressions = [], []
+    for name, stats in results["flows"].items():
+        old = baseline.get("flows", {}).get(name)
+        if old is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "calls_per_interaction", "tokens_per_interaction"):
+            change = 100 * (stats[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            changes.append(f"{metric} {old[metric]} -> {stats[metric]} ({change:+.0f}%)")
+            if max_regression is not None and metric != "p50_ms" and change > max_regression:
+                regressions.append(f"{name}: {metric} {old[metric]} -> {stats[metric]} ({change:+.0f}%)")
+        lines.append(f"{name:<32} " + ", ".join(changes))
+    return lines, regressions
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=300, help="mock time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="uniform ± jitter on the mock latency")
+    parser.add_argument("--token-ms", type=float, default=2, help="mock generation time per completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of mock requests answered with a 429")
+    parser.add_argument("--tts-ms", type=float, default=150, help="latency of the text-to-speech stand-in")
+    parser.add_argument("--rpm", type=int, help="requests per minute budget (default LLM_REQUESTS_PER_MINUTE)")
+    parser.add_argument("--tpm", type=int, help="tokens per minute budget (default LLM_TOKENS_PER_MINUTE)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for mock latency, failures and replies")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure latency, API calls and tokens per interaction against a mock OpenAI server.")
+    parser.add_argument("--iterations", type=int, default=10, help="measured interactions per flow")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured interactions per flow")
+    parser.add_argument("--only", help="run only flows whose name starts with this, e.g. page: or utils:chat")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds an AppTest run may take")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--baseline", help="JSON output of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="with --baseline: exit 1 if p95, calls or tokens of a flow grow by more than this percent")
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    mock, utils = setup_app(args)
+    seed_progress(utils, BENCH_USER)
+    results = {"commit": git_commit(), "config": {name: value for name, value in vars(args).items()
+                                                  if name not in ("json", "baseline", "max_regression", "only")},
+               "flows": {}}
+    for name, flow in flows(utils, timeout=args.timeout).items():
+        if args.only and not name.startswith(args.only):
+            continue
+        results["flows"][name] = measure(flow, mock, args.iterations, args.warmup)
+        if not args.json:
+            print(f"{name} done", file=sys.stderr)
+    results["mock"] = mock.stats()
+    results["service"] = utils.service_stats()
+    mock.stop()
+
+    lines, regressions = [], []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            lines, regressions = compare(results, json.load(f), args.max_regression)
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+    else:
+        print(f"{'flow':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls':>6} {'tokens':>8} {'failed':>7}")
+        for name, stats in results["flows"].items():
+            print(f"{name:<32} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                  f"{stats['calls_per_interaction']:>6.2f} {stats['tokens_per_interaction']:>8.1f} {stats['failures']:>7}")
+    if lines:
+        print(f"Compared with {args.baseline}:", file=sys.stderr if args.json else sys.stdout)
+        for line in lines:
+            print(line, file=sys.stderr if args.json else sys.stdout)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
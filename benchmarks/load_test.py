@@ -0,0 +1,271 @@
+# Concurrent-session load test: N simulated learners at once, each running the real page functions
+# through Streamlit's AppTest on its own thread, against the mock OpenAI server (mock_openai.py).
+#
+#   python benchmarks/load_test.py                                     # ramp 1, 2, 4, 8, 16 users; table
+#   python benchmarks/load_test.py --users 1,10,25,50 --cycles 2 --json
+#   python benchmarks/load_test.py --latency-ms 800 --p95-budget-ms 8000 # capacity under a latency budget
+#
+# Each user keeps one session per page for the whole run and goes through SCENARIO once per cycle:
+# a Daily Practice chat with feedback, a skill-training response, a presentation, and the Progress page
+# with tips. Per concurrency level it reports throughput, latency per step, resident memory added per
+# session (sessions are alive when it is measured) and progress-store write-lock contention. The capacity
+# is the largest level where every interaction succeeded and the p95 stayed within the budget.
+#
+# All sessions share one process, as they do in a Streamlit server, so the LLM scheduler, connection
+# pool, caches and progress database are shared too. AppTest stands in for the browser and the
+# websocket, which the numbers therefore leave out.
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from interactions import setup_app, page_test, button, page_ok, add_backend_arguments, latency_summary, git_commit, \
+    RESPONSE, USER_TURNS
+
+PAGES = {
+    "daily_practice": ("modules.daily_practice", "display_daily_practice"),
+    "skill_training": ("modules.skill_training", "display_skill_training"),
+    "presentation": ("modules.presentation", "display_presentation"),
+    "progress": ("modules.progress", "display_progress"),
+}
+
+
+# One learner: a session per page, kept across cycles like an open browser tab
+class SimulatedUser:
+    def __init__(self, user_id, timeout):
+        self.user_id = user_id
+        self.timeout = timeout
+        self.sessions = {}
+        self.turn = 0
+
+    def page(self, name):
+        if name not in self.sessions:
+            self.sessions[name] = page_test(*PAGES[name], user=self.user_id, timeout=self.timeout)
+        return self.sessions[name]
+
+    def open(self, name):
+        return self.page(name).run()
+
+    def daily_practice_send(self):
+        at = self.page("daily_practice")
+        at.text_input(key="text_input").input(USER_TURNS[self.turn % len(USER_TURNS)])
+        self.turn += 1
+        button(at, "Send").click()
+        return at.run()
+
+    def daily_practice_end_chat(self):
+        at = self.page("daily_practice")
+        button(at, "End Chat").click()
+        at.run()
+        # What "Start New Chat" does, without spending another rerun on it
+        at.session_state["chat_history"] = []
+        return at
+
+    def submit(self, name):
+        at = self.page(name)
+        at.chat_input[0].set_value(f"{RESPONSE} (turn {self.turn})")
+        self.turn += 1
+        return at.run()
+
+    def progress_generate(self):
+        at = self.page("progress")
+        button(at, "Generate").click()
+        return at.run()
+
+
+# Steps of one cycle: (name, action); every action returns the AppTest it ran
+SCENARIO = [
+    ("daily_practice:open", lambda user: user.open("daily_practice")),
+    ("daily_practice:send", lambda user: user.daily_practice_send()),
+    ("daily_practice:send", lambda user: user.daily_practice_send()),
+    ("daily_practice:end_chat", lambda user: user.daily_practice_end_chat()),
+    ("skill_training:open", lambda user: user.open("skill_training")),
+    ("skill_training:submit", lambda user: user.submit("skill_training")),
+    ("presentation:open", lambda user: user.open("presentation")),
+    ("presentation:submit", lambda user: user.submit("presentation")),
+    ("progress:open", lambda user: user.open("progress")),
+    ("progress:generate", lambda user: user.progress_generate()),
+]
+
+
+# AppTest assumes one app run at a time. Each run patches config.get_option and installs a mock Runtime
+# singleton, and undoes both when it finishes, pulling them out from under sessions still running.
+# Holding the config patch for the whole test and serving the last installed runtime while
+# Runtime._instance is cleared lets overlapping runs each see a complete environment.
+@contextmanager
+def concurrent_app_tests():
+    from unittest.mock import patch
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1.util import patch_config_options
+
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        if "runtime" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+
+    with patch_config_options({"global.appTest": True}), \
+            patch.object(Runtime, "instance", classmethod(instance)), \
+            patch.object(Runtime, "exists", classmethod(exists)):
+        yield
+
+
+# Function to read this process's resident memory in bytes
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Peak instead of current where /proc isn't available (kilobytes on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def run_user(user, cycles, think_ms, samples, errors, rng):
+    for _ in range(cycles):
+        for step, action in SCENARIO:
+            time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+            started = time.perf_counter()
+            try:
+                at = action(user)
+                ok = page_ok(at)
+                if not ok:
+                    shown = [element.value for element in list(at.exception) + list(at.error)]
+                    errors.append(f"{user.user_id} {step}: {shown[0] if shown else 'failed'}"[:300])
+            except Exception as e:
+                # The step couldn't be driven (e.g. its widget was missing from the last render), so
+                # it has no latency to report and isn't held against the app
+                errors.append(f"{user.user_id} {step}: {e!r}")
+                ok = None
+            samples.append((step, (time.perf_counter() - started) * 1000, ok))
+
+
+def run_level(users, args, mock, utils, level_index):
+    gc.collect()
+    memory_before = rss_bytes()
+    traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    calls_before = mock.stats()
+    store_before = utils.progress_store.stats()
+    samples, errors = [], []
+    simulated = [SimulatedUser(f"load-{level_index}-{index}", args.timeout) for index in range(users)]
+    threads = [threading.Thread(target=run_user, name=f"user-{index}",
+                                args=(user, args.cycles, args.think_ms, samples, errors, random.Random(args.seed + index)))
+               for index, user in enumerate(simulated)]
+    started = time.perf_counter()
+    for index, thread in enumerate(threads):
+        thread.start()
+        # Spread arrivals over the ramp-up instead of starting everyone in the same instant
+        if users > 1:
+            time.sleep(args.ramp_seconds / users)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    mock.wait_idle()
+    # Measured while every session of this level is still alive
+    gc.collect()
+    memory_after = rss_bytes()
+    traced_after = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    calls_after = mock.stats()
+    store_after = utils.progress_store.stats()
+
+    driven = [(step, ms, ok) for step, ms, ok in samples if ok is not None]
+    steps = {}
+    for step, _ in SCENARIO:
+        step_samples = [ms for name, ms, _ in driven if name == step]
+        if step not in steps and step_samples:
+            steps[step] = latency_summary(step_samples)
+    writes = store_after["writes"] - store_before["writes"]
+    lock_wait = store_after["total_lock_wait"] - store_before["total_lock_wait"]
+    result = {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "interactions": len(driven),
+        "failures": sum(1 for _, _, ok in driven if not ok),
+        "harness_errors": len(samples) - len(driven),
+        "throughput_per_second": round(len(driven) / elapsed, 2),
+        **latency_summary([ms for _, ms, _ in driven]),
+        "steps": steps,
+        "llm_calls": calls_after["requests"] - calls_before["requests"],
+        "llm_rate_limited": calls_after["rate_limited"] - calls_before["rate_limited"],
+        "memory_per_session_mb": round((memory_after - memory_before) / users / 2 ** 20, 2),
+        "rss_mb": round(memory_after / 2 ** 20, 1),
+        "progress_writes": writes,
+        "progress_mean_lock_wait_ms": round(1000 * lock_wait / writes, 2) if writes else 0.0,
+        "progress_max_lock_wait_ms": round(1000 * store_after["max_lock_wait"], 2),
+        "progress_busy_errors": store_after["busy_errors"] - store_before["busy_errors"],
+        "llm_peak_in_flight": utils.client_stats().get("peak_in_flight"),
+        "errors": errors[:10],
+    }
+    if traced_before is not None:
+        result["python_heap_per_session_mb"] = round((traced_after - traced_before) / users / 2 ** 20, 2)
+    del simulated
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated users through the app's pages against a mock OpenAI server.")
+    parser.add_argument("--users", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--cycles", type=int, default=1, help="times each user goes through the scenario")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause before each step (uniform 0 to twice this)")
+    parser.add_argument("--ramp-seconds", type=float, default=2, help="time over which a level's users arrive")
+    parser.add_argument("--p95-budget-ms", type=float, default=10000, help="p95 latency a level may have to count towards capacity")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds an AppTest run may take")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap growth per session (slower)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
+    mock, utils = setup_app(args)
+    levels = [int(users) for users in args.users.split(",")]
+    results = {"commit": git_commit(), "config": {name: value for name, value in vars(args).items() if name != "json"},
+               "levels": [], "capacity_users": 0}
+    with concurrent_app_tests():
+        # One unmeasured pass, so imports, first renders and pool warm-up aren't billed to the first level
+        run_user(SimulatedUser("load-warmup", args.timeout), 1, 0, [], [], random.Random(args.seed))
+        mock.wait_idle()
+        if args.tracemalloc:
+            tracemalloc.start()
+        for index, users in enumerate(levels):
+            level = run_level(users, args, mock, utils, index)
+            results["levels"].append(level)
+            if level["failures"] == 0 and level["p95_ms"] <= args.p95_budget_ms:
+                results["capacity_users"] = max(results["capacity_users"], users)
+            if not args.json:
+                print(f"{users} users done", file=sys.stderr)
+    results["mock"] = mock.stats()
+    mock.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+    else:
+        print(f"{'users':>5} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>6} {'MB/session':>10} "
+              f"{'db writes':>9} {'lock wait ms':>12} {'llm calls':>9}")
+        for level in results["levels"]:
+            print(f"{level['users']:>5} {level['throughput_per_second']:>7.2f} {level['p50_ms']:>8.1f} {level['p95_ms']:>8.1f} "
+                  f"{level['p99_ms']:>8.1f} {level['failures']:>6} {level['memory_per_session_mb']:>10.2f} "
+                  f"{level['progress_writes']:>9} {level['progress_mean_lock_wait_ms']:>12.2f} {level['llm_calls']:>9}")
+        slowest = max(results["levels"][-1]["steps"].items(), key=lambda item: item[1]["p95_ms"])
+        print(f"Slowest step at {results['levels'][-1]['users']} users: {slowest[0]} (p95 {slowest[1]['p95_ms']:.0f} ms)")
+        print(f"Capacity: {results['capacity_users']} concurrent users with no failures and p95 <= {args.p95_budget_ms:.0f} ms")
+        for level in results["levels"]:
+            for error in level["errors"]:
+                print(f"ERROR ({level['users']} users): {error}", file=sys.stderr)
+    logging.shutdown()
+
+
+if __name__ == "__main__":
+    main()
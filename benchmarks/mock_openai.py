@@ -0,0 +1,266 @@
+# Local stand-in for the OpenAI chat completions endpoint, for benchmarks and load tests.
+#
+#   python benchmarks/mock_openai.py --port 8765 --latency-ms 400 --jitter-ms 150 --error-rate 0.02 --rate-limit-rate 0.05
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY1=mock streamlit run app/app.py
+#
+# Replies are canned but shaped like the real API: JSON-mode requests get a valid evaluation (feedback
+# and scores), streamed replies arrive as SSE chunks one word at a time, and every reply carries a usage
+# block. A reply takes latency ± jitter to its first token plus token-ms per completion token, so long
+# outputs cost more, as they do upstream.
+# GET /stats returns the request and token counters; POST /reset clears them.
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CRITERIA = ("content", "delivery", "structure", "language skills", "creativity", "communication", "vocabulary", "grammar")
+WORDS = ("river", "deadline", "museum", "robot", "garden", "budget", "island", "festival", "meeting", "letter",
+         "train", "laptop", "neighbor", "concert", "recipe", "mountain", "startup", "library", "storm", "bicycle",
+         "market", "client", "podcast", "holiday", "forest", "contract", "stadium", "teacher", "bridge", "lantern")
+
+
+# Function to estimate tokens the way the app does for budgeting: about four characters per token
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockOpenAI:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=300, jitter_ms=100, token_ms=2, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after_ms=200, reply_words=60, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.reply_words = reply_words
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+        mock = self
+
+        class Handler(MockHandler):
+            server_mock = mock
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-openai", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {"requests": 0, "ok": 0, "rate_limited": 0, "server_errors": 0, "streamed": 0,
+                             "json_mode": 0, "prompt_tokens": 0, "completion_tokens": 0, "in_flight": 0}
+            self.last_request = 0.0
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+            self.last_request = time.monotonic()
+
+    # Blocks until no request has been in flight for `quiet` seconds (or `timeout` passes), so
+    # background calls triggered by an interaction are counted towards it
+    def wait_idle(self, quiet=0.1, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                idle = self.counters["in_flight"] == 0 and time.monotonic() - self.last_request >= quiet
+            if idle:
+                return True
+            time.sleep(quiet / 4)
+        return False
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    # Returns "rate_limit", "error" or None for this request
+    def failure(self):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return None
+
+    def reply_text(self, request):
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            # Scores vary like real ones, so learners' progress (and their tips requests) differ
+            with self.lock:
+                scores = {criterion: self.random.randint(4, 9) for criterion in CRITERIA}
+            return json.dumps({"feedback": "### Strengths\n" + self.sentences(self.reply_words) +
+                               "\n\n### To improve\n" + self.sentences(self.reply_words), "scores": scores})
+        # Varied wording, so prompt pool refills aren't discarded as near-duplicates
+        return self.sentences(min(self.reply_words, request.get("max_tokens") or self.reply_words))
+
+    def sentences(self, words):
+        with self.lock:
+            picked = [self.random.choice(WORDS) for _ in range(words)]
+        text = []
+        for start in range(0, len(picked), 12):
+            sentence = " ".join(picked[start:start + 12])
+            text.append(sentence[0].upper() + sentence[1:] + ".")
+        return " ".join(text)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keep-alive, so the app's connection pool behaves as it does against the real API
+    protocol_version = "HTTP/1.1"
+    server_mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self.send_json(200, self.server_mock.stats())
+        else:
+            self.send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        mock = self.server_mock
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") == "/reset":
+            mock.reset()
+            self.send_json(200, {"reset": True})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        mock.count(requests=1, in_flight=1)
+        try:
+            self.complete(mock, json.loads(body or b"{}"))
+        finally:
+            mock.count(in_flight=-1)
+
+    def complete(self, mock, request):
+        failure = mock.failure()
+        if failure == "rate_limit":
+            mock.count(rate_limited=1)
+            self.send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                           "code": "rate_limit_exceeded"}},
+                           {"retry-after-ms": str(mock.retry_after_ms)})
+            return
+        time.sleep(mock.delay())
+        if failure == "error":
+            mock.count(server_errors=1)
+            self.send_json(500, {"error": {"message": "The server had an error (mock)", "type": "server_error"}})
+            return
+
+        text = mock.reply_text(request)
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) + 4 for m in request.get("messages", []))
+        completion_tokens = count_tokens(text)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        mock.count(ok=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                   json_mode=1 if request.get("response_format") else 0, streamed=1 if request.get("stream") else 0)
+        base = {"id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                "model": request.get("model", "gpt-3.5-turbo")}
+        if request.get("stream"):
+            self.stream(mock, base, text, usage, (request.get("stream_options") or {}).get("include_usage"))
+            return
+        time.sleep(completion_tokens * mock.token_ms / 1000)
+        self.send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [{
+            "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}]})
+
+    # Server-sent events over chunked transfer encoding, one word per chunk
+    def stream(self, mock, base, text, usage, include_usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        per_word = usage["completion_tokens"] * mock.token_ms / 1000 / len(words)
+        chunk = {**base, "object": "chat.completion.chunk"}
+        self.send_event({**chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                               "finish_reason": None}]})
+        for index, word in enumerate(words):
+            time.sleep(per_word)
+            self.send_event({**chunk, "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word},
+                                                   "finish_reason": None}]})
+        self.send_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            self.send_event({**chunk, "choices": [], "usage": usage})
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.send_chunk(b"")
+
+    def send_event(self, data):
+        self.send_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Function to build a stand-in for utils.synthesize_speech: sleeps `latency_ms` and returns
+# MP3-sized filler bytes (about 1.5 KB per word at gTTS's bitrate)
+def mock_tts(latency_ms=150):
+    def synthesize_speech(text, lang="en", slow=False):
+        time.sleep(latency_ms / 1000)
+        audio = io.BytesIO()
+        audio.write(b"ID3" + b"\0" * (1500 * max(1, len(text.split()))))
+        return audio.getvalue()
+
+    return synthesize_speech
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock OpenAI chat completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300, help="time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="uniform ± jitter on the latency")
+    parser.add_argument("--token-ms", type=float, default=2, help="generation time per completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after-ms", type=int, default=200, help="retry-after-ms sent with each 429")
+    parser.add_argument("--reply-words", type=int, default=60, help="words per reply (and per feedback section)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    mock = MockOpenAI(args.host, args.port, args.latency_ms, args.jitter_ms, args.token_ms, args.error_rate,
+                      args.rate_limit_rate, args.retry_after_ms, args.reply_words, args.seed)
+    print(f"Mock OpenAI API at {mock.url} (set OPENAI_BASE_URL to this)", flush=True)
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(mock.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Cold-start benchmark: import time of every page module in a fresh interpreter.
+#
+#   python benchmarks/startup.py                 # table
+#   python benchmarks/startup.py --json          # machine-readable
+#   python benchmarks/startup.py --budget-ms 150 # exit 1 if a page adds more than 150 ms on top of streamlit
+#
+# A page also fails the check if importing it pulls in one of the DEFERRED libraries,
+# which are only supposed to load when a feature that needs them runs.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+BASELINE = "streamlit"
+MODULES = [
+    "utils.utils",
+    "modules.home",
+    "modules.daily_practice",
+    "modules.skill_training",
+    "modules.presentation",
+    "modules.progress",
+]
+DEFERRED = ["openai", "gtts", "speech_recognition", "pandas", "requests", "tiktoken", "numpy", "vosk"]
+
+
+# Runs `import module` under -X importtime and returns (cumulative µs per imported module, wall seconds)
+def import_profile(module, env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        cumulative[name] = int(cumulative_us)
+    return cumulative
+
+
+def measure(module, runs, env):
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        profile = import_profile(module, env)
+        samples.append(profile.get(module, 0) / 1000)
+        loaded |= {name.split(".")[0] for name in profile}
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples),
+            "deferred_loaded": sorted(name for name in DEFERRED if name in loaded)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time per app module.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget-ms", type=float, default=None, help="max import time a page may add on top of streamlit")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    # Keep the benchmark away from real data: an empty data dir and no legacy CSV import
+    data_dir = tempfile.mkdtemp(prefix="fluentflow-bench-")
+    env = dict(os.environ, PYTHONPATH=APP_DIR, FLUENTFLOW_DATA_DIR=data_dir,
+               LEGACY_PROGRESS_CSV=os.path.join(data_dir, "none.csv"))
+
+    baseline = measure(BASELINE, args.runs, env)
+    results = {"baseline": {BASELINE: baseline}, "modules": {}, "failures": []}
+    for module in MODULES:
+        stats = measure(module, args.runs, env)
+        stats["over_baseline_ms"] = max(stats["median_ms"] - baseline["median_ms"], 0.0)
+        results["modules"][module] = stats
+        if stats["deferred_loaded"]:
+            results["failures"].append(f"{module} eagerly imports {', '.join(stats['deferred_loaded'])}")
+        if args.budget_ms is not None and stats["over_baseline_ms"] > args.budget_ms:
+            results["failures"].append(f"{module} adds {stats['over_baseline_ms']:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{BASELINE:<26} {baseline['median_ms']:>9.1f} ms (baseline)")
+        for module, stats in results["modules"].items():
+            deferred = ", ".join(stats["deferred_loaded"]) or "-"
+            print(f"{module:<26} {stats['median_ms']:>9.1f} ms  +{stats['over_baseline_ms']:.1f} ms  eager heavy deps: {deferred}")
+        for failure in results["failures"]:
+            print(f"FAIL: {failure}")
+    sys.exit(1 if results["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()